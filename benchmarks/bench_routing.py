@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for building routers, matching requests and assembling routes.
+
+Synthetic route tables are generated (deterministically, so results can be
+compared between runs) from a mix of Literal routes, Segment routes, routes
+with optional segments and routes with many requirements. For each table
+size and matcher the following are measured:
+
+- build: The seconds taken to create the router and warm it.
+- memory: The bytes allocated by the router (measured with tracemalloc).
+- match: The seconds per match for routes at the first, middle and last
+  position of the table, and for a request that matches nothing.
+- assemble: The number of routes assembled per second.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/bench_routing.py --sizes 10 100 1000 --output 1.3.0.json
+    python benchmarks/bench_routing.py --compare 1.2.0.json 1.3.0.json
+
+Results are written as JSON, and --compare prints the ratio of each timing
+in the second file to the first (< 1.0 is faster).
+
+The script also runs against releases prior to 1.3.0, which have no
+matchers, in which case only the router itself is measured (as 'Linear').
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+import os
+from wsgiref import util
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import watson.routing  # noqa
+from watson.http.messages import Request  # noqa
+from watson.routing import routers, routes  # noqa
+try:
+    from watson.routing import matchers
+except ImportError:  # pragma: no cover
+    # Releases prior to 1.3.0 always match every route in turn
+    matchers = None
+
+SIZES = (10, 100, 1000, 10000, 100000)
+MATCHERS = ('Linear', 'Trie', 'Regex', 'Mapped') if matchers else ('Linear',)
+HOST = 'api.example.com'
+# A single mime type, as releases prior to 1.3.0 do not parse Accept lists
+ACCEPT = 'application/json'
+MISSING = '/missing/path/that/matches/nothing'
+
+
+def generate_routes(size, seed=0):
+    """Generates a route table of the given size.
+
+    Returns:
+        tuple: The route definitions, and a path that matches each route.
+    """
+    rand = random.Random(seed)
+    definitions, paths = {}, {}
+    for index in range(size):
+        name = 'route{0}'.format(index)
+        section = 'section{0}'.format(index)
+        kind = rand.random()
+        if kind < 0.4:
+            definition = {'path': '/{0}/page'.format(section)}
+            path = definition['path']
+        elif kind < 0.7:
+            definition = {'path': '/{0}/:slug/:id'.format(section)}
+            path = '/{0}/post/{1}'.format(section, index)
+        elif kind < 0.85:
+            definition = {'path': '/{0}[/:year[/:month]]'.format(section)}
+            path = '/{0}/2019/06'.format(section)
+        else:
+            definition = {
+                'path': '/{0}/:id'.format(section),
+                'accepts': ('GET', 'POST'),
+                'requires': {'id': r'\d+', 'format': 'json', 'subdomain': 'api'},
+                'defaults': {'version': '1'}
+            }
+            path = '/{0}/{1}'.format(section, index)
+        definitions[name] = definition
+        paths[name] = path
+    return definitions, paths
+
+
+def request(path):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': HOST, 'HTTP_ACCEPT': ACCEPT}
+    util.setup_testing_defaults(environ)
+    return Request(environ)
+
+
+def per_call(callable_, repeat=3, budget=0.05):
+    """Retrieve the best time (in seconds) of a single call.
+
+    The number of calls per repeat is chosen so that each repeat takes
+    roughly budget seconds.
+    """
+    timer = timeit.Timer(callable_)
+    number = max(1, int(budget / max(timer.timeit(1), 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def build(definitions, matcher):
+    definitions = dict((k, dict(v)) for k, v in definitions.items())
+    if matchers is None:
+        return routers.Dict(definitions)
+    router = routers.Dict(definitions, matcher=getattr(matchers, matcher))
+    router.warm()
+    return router
+
+
+def ordered_routes(router):
+    if matchers is None:
+        return list(router.routes.values())
+    return router.matcher.routes
+
+
+def bench_table(size, matcher, seed=0):
+    definitions, paths = generate_routes(size, seed)
+
+    start = time.perf_counter()
+    router = build(definitions, matcher)
+    build_seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    build(definitions, matcher)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ordered = ordered_routes(router)
+    match = {}
+    positions = (('first', 0), ('middle', len(ordered) // 2),
+                 ('last', len(ordered) - 1))
+    for label, position in positions:
+        route = ordered[position]
+        req = request(paths[route.name])
+        route_match = router.match(req)
+        assert route_match and route_match.route is route, route.name
+        match[label] = per_call(lambda: router.match(req))
+    req = request(MISSING)
+    assert router.match(req) is None
+    match['miss'] = per_call(lambda: router.match(req))
+
+    params = {'slug': 'post', 'id': 1, 'year': 2019, 'month': 6}
+    names = [route.name for route in ordered[:100]]
+
+    def assemble():
+        for name in names:
+            router.assemble(name, **params)
+    assemble_per_second = len(names) / per_call(assemble)
+
+    return {
+        'size': size,
+        'matcher': matcher,
+        'build': build_seconds,
+        'memory': memory,
+        'match': match,
+        'assemble': assemble_per_second,
+    }
+
+
+def bench_routes():
+    """Benchmarks individual routes, independent of any router.
+    """
+    segment = routes.Segment(name='segment', path='/user/:id[/:action]',
+                             requires={'id': r'\d+'})
+    literal = routes.Literal(name='literal', path='/about')
+    hit, miss, about = request('/user/1/edit'), request(MISSING), request('/about')
+    return {
+        'segment_match': per_call(lambda: segment.match(hit)),
+        'segment_miss': per_call(lambda: segment.match(miss)),
+        'segment_assemble': per_call(lambda: segment.assemble(id=1, action='edit')),
+        'literal_match': per_call(lambda: literal.match(about)),
+    }
+
+
+def run(sizes, matcher_names, seed=0):
+    results = {
+        'version': watson.routing.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'seed': seed,
+        'routes': bench_routes(),
+        'tables': [],
+    }
+    for size in sizes:
+        for matcher in matcher_names:
+            result = bench_table(size, matcher, seed)
+            results['tables'].append(result)
+            sys.stderr.write(
+                '{size:>7} {matcher:<7} build {build:.4f}s, last {last:.2e}s, '
+                'miss {miss:.2e}s\n'.format(
+                    last=result['match']['last'], miss=result['match']['miss'],
+                    **result))
+    return results
+
+
+def _flatten(results):
+    flat = {}
+    for key, value in results['routes'].items():
+        flat['routes.{0}'.format(key)] = value
+    for table in results['tables']:
+        prefix = '{0}.{1}'.format(table['size'], table['matcher'])
+        flat[prefix + '.build'] = table['build']
+        flat[prefix + '.memory'] = table['memory']
+        # Invert throughput so that every ratio < 1.0 is an improvement
+        flat[prefix + '.assemble'] = 1 / table['assemble']
+        for key, value in table['match'].items():
+            flat['{0}.match.{1}'.format(prefix, key)] = value
+    return flat
+
+
+def compare(before, after):
+    """Prints the ratio of each measurement in after to before.
+    """
+    before, after = _flatten(before), _flatten(after)
+    for key in sorted(set(before) & set(after), key=lambda k: k.split('.')):
+        ratio = after[key] / before[key] if before[key] else float('inf')
+        print('{0:<40} {1:>8.2f}'.format(key, ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--matchers', nargs='+', default=MATCHERS, choices=MATCHERS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='The file to write the results to.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args(argv)
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            compare(json.load(before), json.load(after))
+        return
+    results = run(args.sizes, args.matchers, args.seed)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
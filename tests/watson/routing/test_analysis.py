@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import re
+from watson.routing import analysis, routers, routes
+from tests.watson.routing.support import sample_request
+
+
+def sample_routes():
+    return {
+        'home': {'path': '/'},
+        'about': {'path': '/about'},
+        'about-company': {'path': '/about[/:company]', 'priority': 2},
+        'user': {'path': '/user/:id', 'requires': {'id': r'\d+'}},
+        'user-literal': {'path': '/user/1'},
+        'page': {'path': '/page/:slug<slug>'},
+        'page-any': {'path': '/page/:name', 'priority': 2},
+        'post': {'path': '/page/:slug<slug>', 'accepts': ('POST',)},
+        'static': {'regex': '^/static/.*'},
+    }
+
+
+def segment(path, **kwargs):
+    return routes.Segment(name=path, path=path, **kwargs)
+
+
+class TestCovers(object):
+    def test_literals(self):
+        assert analysis.covers(routes.Literal(name='a', path='/a'), routes.Literal(name='b', path='/a'))
+        assert not analysis.covers(routes.Literal(name='a', path='/a'), routes.Literal(name='b', path='/b'))
+        assert analysis.covers(segment('/:page'), routes.Literal(name='b', path='/b'))
+        assert not analysis.covers(segment('/:id<int>'), routes.Literal(name='b', path='/b'))
+        assert not analysis.covers(routes.Literal(name='a', path='/a'), segment('/:page'))
+
+    def test_segments(self):
+        assert analysis.covers(segment('/:section/:id'), segment('/user/:id'))
+        assert analysis.covers(segment('/user/:id'), segment('/user/:id<int>'))
+        assert analysis.covers(segment('/user[/:id]'), segment('/user'))
+        assert not analysis.covers(segment('/user/:id'), segment('/user[/:id]'))
+        assert not analysis.covers(segment('/user/:id<int>'), segment('/user/:id'))
+        assert not analysis.covers(segment('/:section'), segment('/'))
+        assert analysis.covers(segment('/user/:id', requires={'id': r'\d+'}),
+                               segment('/user/:id', requires={'id': r'\d+'}))
+        assert not analysis.covers(segment('/user/:id', requires={'id': r'\d+'}),
+                                   segment('/user/:id'))
+
+    def test_requirements(self):
+        assert not analysis.covers(segment('/:page', accepts=('GET',)), segment('/:page'))
+        assert analysis.covers(segment('/:page'), segment('/:page', accepts=('GET',)))
+        assert not analysis.covers(segment('/:page', requires={'subdomain': 'www'}),
+                                   segment('/:page'))
+        assert analysis.covers(segment('/:page', requires={'subdomain': ('www', 'api')}),
+                               segment('/:page', requires={'subdomain': 'www'}))
+        assert not analysis.covers(segment('/:page', requires={'format': 'json'}),
+                                   segment('/:page', requires={'format': 'json|xml'}))
+
+    def test_optionals_end_path(self):
+        # Sibling optionals can't both match, as each ends the path
+        assert not analysis.covers(segment('/:a[/:b][/:c]'), segment('/user/:id/:action'))
+        assert not analysis.covers(segment('/:a[/:b]/edit'), segment('/:a/:b/edit'))
+        assert analysis.covers(segment('/:a[/:b[/:c]]'), segment('/user/:id/:action'))
+
+    def test_regex_with_path(self):
+        compiled = routes.Segment(name='compiled', path='/user', regex=re.compile(r'/user/\d+'))
+        string = routes.Segment(name='string', path='/user', regex=r'^/user/\d+')
+        for route in (compiled, string):
+            assert not analysis.covers(route, segment('/user/:id'))
+            assert not analysis.covers(segment('/user/:id'), route)
+            assert analysis.covers(route, routes.Literal(name='l', path='/user/1'))
+
+    def test_defaults(self):
+        assert analysis.covers(segment('/user/:id', defaults={'controller': 'x'}),
+                               routes.Literal(name='l', path='/user/1'))
+
+
+class TestAnalysis(object):
+    def test_shadowed(self):
+        router = routers.Dict(sample_routes())
+        result = router.analyse()
+        assert result.as_dict()['shadowed'] == {
+            'about': 'about-company', 'page': 'page-any', 'post': 'page-any'}
+        assert result.reachable == tuple(
+            route for route in router.matcher.routes
+            if route.name not in ('about', 'page', 'post'))
+        assert repr(result) == '<watson.routing.analysis.Analysis routes:9 shadowed:3>'
+
+    def test_overlapping(self):
+        router = routers.Dict(sample_routes())
+        result = router.analyse()
+        overlapping = result.as_dict()['overlapping']
+        assert overlapping['user'] == ['static', 'user-literal']
+        assert 'home' in result.as_dict()['disjoint']
+        assert result.disjoint(router.routes['home'], router.routes['about'])
+        assert not result.disjoint(router.routes['user-literal'], router.routes['user'])
+
+    def test_prune(self):
+        router = routers.Dict(sample_routes(), cache_size=10)
+        pruned = routers.Dict(sample_routes(), cache_size=10)
+        pruned.freeze()
+        pruned.analyse(prune=True)
+        assert len(pruned.matcher) == 6
+        assert len(pruned) == 9
+        assert pruned.frozen
+        assert pruned.assemble('about') == '/about'
+        for path in ('/', '/about', '/about/acme', '/user/1', '/user/a', '/page/a-b',
+                     '/static/site.css', '/missing'):
+            for method in ('GET', 'POST'):
+                request = sample_request(PATH_INFO=path, REQUEST_METHOD=method)
+                expected = [(m.route.name, m.params) for m in router.matches(request)
+                            if m.route.name not in ('about', 'page', 'post')]
+                assert [(m.route.name, m.params) for m in pruned.matches(request)] == expected
+                route_match = pruned.match(request)
+                assert (route_match.route.name if route_match else None) == (
+                    expected[0][0] if expected else None)
+        pruned.add_definition({'name': 'contact', 'path': '/contact'})
+        assert len(pruned.matcher) == 10
+
+    def test_prune_optionals(self):
+        router = routers.Dict({
+            'catch': {'path': '/:a[/:b][/:c]', 'priority': 2},
+            'user': {'path': '/user/:id/:action'},
+            'literal': {'path': '/user/1', 'defaults': {'controller': 'x'}},
+            'defaults': {'path': '/user/:id', 'defaults': {'controller': 'x'}, 'priority': 1},
+        })
+        result = router.analyse(prune=True)
+        assert result.as_dict()['shadowed'] == {'literal': 'catch'}
+        route_match = router.match(sample_request(PATH_INFO='/user/1/edit'))
+        assert route_match.route.name == 'user'
+
+    def test_regex_with_path(self):
+        definitions = sample_routes()
+        definitions['compiled'] = {'path': '/user', 'regex': re.compile(r'/user/\d+'),
+                                   'priority': 2}
+        router = routers.Dict(definitions)
+        result = router.analyse(prune=True)
+        assert result.as_dict()['shadowed']['user-literal'] == 'compiled'
+        assert 'user' not in result.as_dict()['shadowed']
+        assert router.match(sample_request(PATH_INFO='/user/1')).route.name == 'compiled'
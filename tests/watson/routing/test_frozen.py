@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from watson.routing import frozen, matchers, routers, routes
+from tests.watson.routing.support import sample_request
+
+
+class Tagged(routes.Literal):
+    def match(self, request):
+        route_match = super(Tagged, self).match(request)
+        if route_match:
+            route_match.params['tagged'] = True
+        return route_match
+
+
+def sample_routes():
+    return {
+        'home': {'path': '/'},
+        'about': {'path': '/about', 'defaults': {'page': 'about'}},
+        'user': {'path': '/user/:id<int>', 'defaults': {'tab': None}},
+        'user-edit': {'path': '/user/:id/edit', 'accepts': ('POST',)},
+        'search': {'path': '/search', 'requires': {'page': r'\d+'}},
+        'xml': {'path': '/user/:id', 'requires': {'format': 'xml'}, 'priority': 2},
+        'acme': {'path': '/about', 'requires': {'subdomain': 'acme'}, 'priority': 3},
+        'edit': {'path': '/edit/:id', 'accepts': 'GET'},
+    }
+
+
+def sample_router():
+    router = routers.Dict(sample_routes())
+    router.add_route(Tagged(name='tagged', path='/tagged'))
+    return router
+
+
+def sample_requests():
+    for host in ('acme.example.com', 'example.com'):
+        for accept in ('text/html', 'application/xml'):
+            for method in ('GET', 'POST'):
+                for path in ('/', '/about', '/user/1', '/user/a', '/user/1/edit',
+                             '/search', '/tagged', '/edit/1', '/missing'):
+                    for query in ('', 'page=1', 'page=a'):
+                        yield sample_request(
+                            PATH_INFO=path, REQUEST_METHOD=method, QUERY_STRING=query,
+                            HTTP_HOST=host, HTTP_ACCEPT=accept)
+
+
+class TestCompileMatch(object):
+    def test_same_match_as_routes(self):
+        router = sample_router()
+        match = frozen.compile_match(router.matcher.routes)
+        for request in sample_requests():
+            expected = router.match(request)
+            route_match = match(request)
+            if expected is None:
+                assert route_match is None
+            else:
+                assert (route_match.route, route_match.params) == expected
+
+    def test_candidates(self):
+        for matcher in (matchers.Linear, matchers.Trie, matchers.Regex, matchers.Mapped):
+            router = sample_router()
+            narrowed = routers.Dict(sample_routes(), matcher=matcher)
+            narrowed.add_route(Tagged(name='tagged', path='/tagged'))
+            match = frozen.compile_match(narrowed.matcher.routes, narrowed.matcher.candidates)
+            for request in sample_requests():
+                expected = router.match(request)
+                route_match = match(request)
+                if expected is None:
+                    assert route_match is None
+                else:
+                    assert (route_match.route.name, route_match.params) == (
+                        expected.route.name, expected.params)
+
+    def test_accepts_string(self):
+        router = routers.Dict({'edit': {'path': '/edit/:id', 'accepts': 'GET'}})
+        match = frozen.compile_match(router.matcher.routes)
+        assert match(sample_request(PATH_INFO='/edit/1')).params == {'id': '1'}
+        assert not match(sample_request(PATH_INFO='/edit/1', REQUEST_METHOD='POST'))
+
+    def test_source(self):
+        router = sample_router()
+        source, namespace = frozen.source_from_routes(router.matcher.routes)
+        assert source.startswith('# ')
+        assert 'def match(request):' in source
+        assert "if path == '/about':" in source
+        assert "(request, method, path, shared):\n    return route_" in source
+        assert 'for match_route in ordered:' in source
+        assert 'shared = _Shared()' in source
+        assert source.count('shared.subdomain = request.url.subdomain') == 1
+        assert 'if shared.accepted is _unset:' in source
+        source, namespace = frozen.source_from_routes(routers.Dict({'home': {'path': '/'}}).matcher.routes)
+        assert 'shared = None' in source
+        source, namespace = frozen.source_from_routes(router.matcher.routes, router.matcher.candidates)
+        assert 'for route in candidates(request):' in source
+        assert 'RouteMatch' in namespace
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from watson.routing import instruments, matchers, routers
+from tests.watson.routing.support import sample_request
+
+
+def sample_routes():
+    return {
+        'home': {'path': '/'},
+        'user': {'path': '/user/:id', 'requires': {'id': r'\d+'}},
+        'search': {'path': '/search', 'requires': {'page': r'\d+'}},
+        'create': {'path': '/create', 'accepts': ('POST',)},
+        'xml': {'path': '/user/:id', 'requires': {'format': 'xml'}, 'priority': 2},
+    }
+
+
+class TestCounters(object):
+    def test_match(self):
+        instrument = instruments.Counters()
+        router = routers.Dict(sample_routes(), instrument=instrument)
+        assert router.match(sample_request(PATH_INFO='/user/1')).route.name == 'user'
+        assert not router.match(sample_request(PATH_INFO='/search', QUERY_STRING='page=a'))
+        assert instrument.requests == 2
+        assert instrument.misses == 1
+        assert instrument.hits == {'user': 1}
+        assert instrument.rejections['format'] == 1
+        assert instrument.rejections['path'] >= 1
+        assert instrument.rejections['query'] == 1
+        counters = instrument.as_dict()
+        assert counters['tried'] == instrument.tried
+        assert counters['duration_per_request'] > 0
+        assert repr(instrument).startswith('<watson.routing.instruments.Counters requests:2')
+        instrument.reset()
+        assert instrument.as_dict()['requests'] == 0
+
+    def test_tried(self):
+        instrument = instruments.Counters()
+        router = routers.Dict(sample_routes(), matcher=matchers.Trie,
+                              instrument=instrument, cache_size=10)
+        request = sample_request(PATH_INFO='/user/1')
+        router.match(request)
+        assert instrument.tried == 2
+        router.match(request)
+        assert instrument.tried == 2
+        assert instrument.requests == 2
+
+    def test_choice(self):
+        instrument = instruments.Counters()
+        router = routers.Choice(routers.Dict(sample_routes()), instrument=instrument)
+        router.match(sample_request(PATH_INFO='/create'))
+        assert instrument.hits == {}
+        assert instrument.rejections['method'] == 1
+
+    def test_base(self):
+        instrument = instruments.Base()
+        router = routers.Dict(sample_routes(), instrument=instrument)
+        assert router.match(sample_request()).route.name == 'home'
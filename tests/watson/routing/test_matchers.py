@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+import re
+from watson.routing import matchers, routers, routes
+from tests.watson.routing.support import sample_request
+
+
+def sample_routes():
+    return {
+        'home': {'path': '/'},
+        'about': {'path': '/about'},
+        'about-company': {'path': '/about[/:company[/:team]]', 'priority': 2},
+        'user': {'path': '/user/:id', 'requires': {'id': r'\d+'}},
+        'user-edit': {'path': '/user/:id/edit'},
+        'file': {'path': '/files/v:version'},
+        'search': {'path': '/search/:keyword', 'accepts': ('POST',)},
+        'wildcard': {'regex': '^/static/.*', 'priority': 3},
+    }
+
+
+def subdomain_routes():
+    return {
+        'home': {'path': '/'},
+        'acme-home': {'path': '/', 'requires': {'subdomain': 'acme'}, 'priority': 2},
+        'page': {'path': '/:page'},
+        'tenant-page': {'path': '/:page', 'requires': {'subdomain': ('acme', 'initech')},
+                        'priority': 2},
+        'initech-about': {'path': '/about', 'requires': {'subdomain': 'initech'}},
+    }
+
+
+def subdomain_requests():
+    for host in ('acme.example.com', 'initech.example.com', 'other.example.com',
+                 'example.com'):
+        for path in ('/', '/about', '/contact'):
+            yield sample_request(PATH_INFO=path, HTTP_HOST=host)
+
+
+def sample_paths():
+    return ('/', '/about', '/about/acme', '/about/acme/dev', '/about/a/b/c',
+            '/user/1', '/user/abc', '/user/1/edit', '/user', '/files/v1',
+            '/files/1', '/search/test', '/static/css/site.css', '/missing',
+            '/about\n', '')
+
+
+class TestLinear(object):
+    def test_candidates(self):
+        route = routes.Literal(name='home', path='/')
+        matcher = matchers.Linear([route])
+        assert len(matcher) == 1
+        assert list(matcher.candidates(sample_request())) == [route]
+        assert not list(matcher.candidates(sample_request(PATH_INFO='/about')))
+
+    def test_literals_indexed_by_path(self):
+        router = routers.Dict(sample_routes())
+        candidates = router.matcher.candidates(sample_request(PATH_INFO='/about'))
+        names = [route.name for route in candidates]
+        assert names == ['wildcard', 'about-company', 'user-edit', 'user',
+                         'file', 'about']
+        candidates = router.matcher.candidates(sample_request(PATH_INFO='/contact'))
+        assert 'about' not in [route.name for route in candidates]
+
+    def test_partitioned_by_method(self):
+        router = routers.Dict(sample_routes())
+        request = sample_request(PATH_INFO='/search/test', REQUEST_METHOD='POST')
+        assert 'search' in [route.name for route in router.matcher.candidates(request)]
+        request = sample_request(PATH_INFO='/search/test')
+        assert 'search' not in [route.name for route in router.matcher.candidates(request)]
+        request = sample_request(PATH_INFO='/search/test', REQUEST_METHOD='PATCH')
+        assert not list(router.matcher.candidates(request))
+
+    def test_literal_priority(self):
+        router = routers.Dict({
+            'literal': {'path': '/user/me', 'priority': 2},
+            'segment': {'path': '/user/:id'},
+            'override': {'path': '/user/:id', 'requires': {'id': 'me'}, 'priority': 3},
+        })
+        request = sample_request(PATH_INFO='/user/me')
+        assert [m.route.name for m in router.matches(request)] == [
+            'override', 'literal', 'segment']
+
+    def test_same_match_as_routes(self):
+        router = routers.Dict(sample_routes())
+        for path in sample_paths():
+            for method in ('GET', 'POST'):
+                request = sample_request(PATH_INFO=path, REQUEST_METHOD=method)
+                expected = [route.name for name, route in router
+                            if route.match(request)]
+                assert [m.route.name for m in router.matches(request)] == expected
+
+    def test_bucketed_by_subdomain(self):
+        router = routers.Dict(subdomain_routes())
+        assert ('GET', 'initech') in router.matcher._subdomains
+        assert [r.name for r in router.matcher._subdomains[('GET', 'acme')]] == ['tenant-page']
+        assert [r.name for r in router.matcher._methods['GET']] == ['page']
+        request = sample_request(PATH_INFO='/contact', HTTP_HOST='other.example.com')
+        assert [r.name for r in router.matcher.candidates(request)] == ['page']
+        for request in subdomain_requests():
+            expected = [route.name for name, route in router if route.match(request)]
+            assert [m.route.name for m in router.matches(request)] == expected
+
+
+class TestTrie(object):
+    def test_narrows_candidates(self):
+        router = routers.Dict(sample_routes(), matcher=matchers.Trie)
+        candidates = router.matcher.candidates(sample_request(PATH_INFO='/user/1'))
+        names = [route.name for route in candidates]
+        assert names == ['wildcard', 'user']
+        request = sample_request(PATH_INFO='/search/test', REQUEST_METHOD='POST')
+        candidates = router.matcher.candidates(request)
+        assert [route.name for route in candidates] == ['wildcard', 'search']
+        request = sample_request(PATH_INFO='/search/test')
+        candidates = router.matcher.candidates(request)
+        assert [route.name for route in candidates] == ['wildcard']
+
+    def test_optional_segments(self):
+        router = routers.Dict(sample_routes(), matcher=matchers.Trie)
+        for path in ('/about', '/about/acme', '/about/acme/dev'):
+            candidates = router.matcher.candidates(sample_request(PATH_INFO=path))
+            assert 'about-company' in [route.name for route in candidates]
+
+    def test_same_match_as_linear(self):
+        linear = routers.Dict(sample_routes())
+        trie = routers.Dict(sample_routes(), matcher=matchers.Trie)
+        for path in sample_paths():
+            for method in ('GET', 'POST'):
+                request = sample_request(PATH_INFO=path, REQUEST_METHOD=method)
+                expected = [m.route.name for m in linear.matches(request)]
+                assert [m.route.name for m in trie.matches(request)] == expected
+
+    def test_subdomains(self):
+        linear = routers.Dict(subdomain_routes())
+        trie = routers.Dict(subdomain_routes(), matcher=matchers.Trie)
+        for request in subdomain_requests():
+            expected = [m.route.name for m in linear.matches(request)]
+            assert [m.route.name for m in trie.matches(request)] == expected
+
+    def test_converters(self):
+        definitions = {
+            'user': {'path': '/user/:id<int>'},
+            'file': {'path': '/files/:path<path>'},
+            'edit': {'path': '/user/:id<int>/edit'},
+        }
+        linear = routers.Dict(definitions)
+        trie = routers.Dict(definitions, matcher=matchers.Trie)
+        candidates = trie.matcher.candidates(sample_request(PATH_INFO='/user/1'))
+        assert [route.name for route in candidates] == ['user']
+        for path in ('/user/1', '/user/a', '/user/1/edit', '/files/a/b/c', '/files'):
+            request = sample_request(PATH_INFO=path)
+            expected = [(m.route.name, m.params) for m in linear.matches(request)]
+            assert [(m.route.name, m.params) for m in trie.matches(request)] == expected
+
+    def test_too_many_optional_segments(self):
+        path = '/x' + ''.join('[/:s{0}]'.format(i) for i in range(7))
+        router = routers.Dict({'many': {'path': path}}, matcher=matchers.Trie)
+        assert router.match(sample_request(PATH_INFO='/x/a'))
+
+    def test_regex_with_path(self):
+        # The segments of a route with a regex do not describe its path
+        definitions = {
+            'compiled': {'path': '/files', 'regex': re.compile(r'/files/\d+')},
+            'string': {'path': '/images', 'regex': r'^/images/\d+'},
+            'user': {'path': '/user/:id'},
+        }
+        linear = routers.Dict(definitions)
+        for matcher in (matchers.Trie, matchers.Mapped):
+            router = routers.Dict(definitions, matcher=matcher)
+            for path in ('/files/1', '/files/1/a', '/images/1', '/user/1', '/files'):
+                request = sample_request(PATH_INFO=path)
+                expected = [(m.route.name, m.params) for m in linear.matches(request)]
+                assert [(m.route.name, m.params) for m in router.matches(request)] == expected
+            assert router.match(sample_request(PATH_INFO='/files/1')).route.name == 'compiled'
+
+    def test_invalidated_when_route_added(self):
+        router = routers.Dict(sample_routes(), matcher=matchers.Trie)
+        request = sample_request(PATH_INFO='/contact')
+        assert not router.match(request)
+        router.add_definition({'name': 'contact', 'path': '/contact'})
+        assert router.match(request).route.name == 'contact'
+
+
+class TestRegex(object):
+    def test_same_match_as_linear(self):
+        linear = routers.Dict(sample_routes())
+        regex = routers.Dict(sample_routes(), matcher=matchers.Regex)
+        for path in sample_paths():
+            for method in ('GET', 'POST'):
+                request = sample_request(PATH_INFO=path, REQUEST_METHOD=method)
+                expected = [(m.route.name, m.params) for m in linear.matches(request)]
+                assert [(m.route.name, m.params) for m in regex.matches(request)] == expected
+
+    def test_subdomains(self):
+        linear = routers.Dict(subdomain_routes())
+        regex = routers.Dict(subdomain_routes(), matcher=matchers.Regex)
+        regex.warm()
+        assert ('GET', 'initech') in regex.matcher._blocks
+        for request in subdomain_requests():
+            expected = [(m.route.name, m.params) for m in linear.matches(request)]
+            assert [(m.route.name, m.params) for m in regex.matches(request)] == expected
+
+    def test_converters(self):
+        router = routers.Dict({'user': {'path': '/user/:id<int>/:key<slug>'}},
+                              matcher=matchers.Regex)
+        match = router.match(sample_request(PATH_INFO='/user/10/a-b'))
+        assert match.params == {'id': 10, 'key': 'a-b'}
+
+    def test_warm(self):
+        router = routers.Dict(sample_routes(), matcher=matchers.Regex)
+        router.warm()
+        blocks = router.matcher._blocks_for('GET')
+        assert all(block._regex for block in blocks if isinstance(block, matchers._Alternation))
+
+    def test_params_from_combined_match(self):
+        router = routers.Dict(sample_routes(), matcher=matchers.Regex)
+        match = router.match(sample_request(PATH_INFO='/about/acme/dev'))
+        assert match.route.name == 'about-company'
+        assert match.params == {'company': 'acme', 'team': 'dev'}
+
+    def test_chunked(self):
+        definitions = {
+            'page{0}'.format(i): {'path': '/page{0}/:id'.format(i)} for i in range(10)}
+        definitions['any'] = {'path': '/:section/:id', 'accepts': ('POST',)}
+        definitions['unnamed'] = {'path': '/(x)/:id', 'requires': {'id': r'(\d)+'}}
+
+        class Chunked(matchers.Regex):
+            chunk_size = 3
+
+        router = routers.Dict(definitions, matcher=Chunked)
+        match = router.match(sample_request(PATH_INFO='/page7/1'))
+        assert match.route.name == 'page7'
+        assert match.params == {'id': '1'}
+        request = sample_request(PATH_INFO='/page7/1', REQUEST_METHOD='POST')
+        assert [m.route.name for m in router.matches(request)] == ['page7', 'any']
+        assert router.match(sample_request(PATH_INFO='/(x)/11')).route.name == 'unnamed'
+        assert not router.match(sample_request(PATH_INFO='/(x)/ab'))
+
+    def test_conditional_group_references(self):
+        definitions = {
+            'page': {'path': '/page/:id'},
+            'conditional': {'path': '/cond/:id', 'requires': {'id': r'(?P<x>a)?(?(x)b|c)'}},
+        }
+        router = routers.Dict(definitions, matcher=matchers.Regex)
+        assert not matchers._combinable(router.routes['conditional'])
+        assert router.match(sample_request(PATH_INFO='/cond/ab')).route.name == 'conditional'
+        assert router.match(sample_request(PATH_INFO='/cond/c')).route.name == 'conditional'
+        assert not router.match(sample_request(PATH_INFO='/cond/b'))
+
+    def test_continues_within_alternation(self):
+        router = routers.Dict({
+            'user': {'path': '/user/:id', 'requires': {'page': r'\d+'}},
+            'any': {'path': '/:section/:id'},
+        }, matcher=matchers.Regex)
+        match = router.match(sample_request(PATH_INFO='/user/1', QUERY_STRING='page=x'))
+        assert match.route.name == 'any'
+        assert match.params == {'section': 'user', 'id': '1'}
+
+
+class TestMapped(object):
+    def test_same_match_as_linear(self):
+        linear = routers.Dict(sample_routes())
+        mapped = routers.Dict(sample_routes(), matcher=matchers.Mapped)
+        for path in sample_paths():
+            for method in ('GET', 'POST', 'PUT'):
+                request = sample_request(PATH_INFO=path, REQUEST_METHOD=method)
+                expected = [(m.route.name, m.params) for m in linear.matches(request)]
+                assert [(m.route.name, m.params) for m in mapped.matches(request)] == expected
+
+    def test_subdomains(self):
+        linear = routers.Dict(subdomain_routes())
+        mapped = routers.Dict(subdomain_routes(), matcher=matchers.Mapped)
+        for request in subdomain_requests():
+            expected = [m.route.name for m in linear.matches(request)]
+            assert [m.route.name for m in mapped.matches(request)] == expected
+        candidates = mapped.matcher.candidates(
+            sample_request(PATH_INFO='/about', HTTP_HOST='other.example.com'))
+        assert [route.name for route in candidates] == ['page']
+
+    def test_narrows_candidates(self):
+        router = routers.Dict(sample_routes(), matcher=matchers.Mapped)
+        candidates = router.matcher.candidates(sample_request(PATH_INFO='/user/1'))
+        assert [route.name for route in candidates] == ['wildcard', 'user']
+
+    def test_shared_file(self, tmpdir):
+        class Mapped(matchers.Mapped):
+            filename = str(tmpdir.join('routes.index'))
+
+        router = routers.Dict(sample_routes(), matcher=Mapped)
+        router.warm()
+        modified = tmpdir.join('routes.index').mtime()
+        request = sample_request(PATH_INFO='/user/1/edit')
+        assert router.match(request).route.name == 'user-edit'
+        other = routers.Dict(sample_routes(), matcher=Mapped)
+        assert other.match(request).route.name == 'user-edit'
+        assert tmpdir.join('routes.index').mtime() == modified
+        assert len(tmpdir.listdir()) == 1
+
+    def test_rebuilt_when_changed(self, tmpdir):
+        class Mapped(matchers.Mapped):
+            filename = str(tmpdir.join('routes.index'))
+
+        routers.Dict(sample_routes(), matcher=Mapped).warm()
+        definitions = sample_routes()
+        definitions['contact'] = {'path': '/contact'}
+        router = routers.Dict(definitions, matcher=Mapped)
+        assert router.match(sample_request(PATH_INFO='/contact')).route.name == 'contact'
+        tmpdir.join('routes.index').write_binary(b'corrupt')
+        router = routers.Dict(sample_routes(), matcher=Mapped)
+        assert router.match(sample_request(PATH_INFO='/user/1')).route.name == 'user'
+
+
+class TestDisjoint(object):
+    def test_methods_and_subdomains(self):
+        get = routes.Segment(name='get', path='/:id', accepts=('GET',))
+        post = routes.Segment(name='post', path='/:id', accepts='POST')
+        assert matchers.disjoint(get, post)
+        www = routes.Segment(name='www', path='/:id', requires={'subdomain': 'www'})
+        api = routes.Segment(name='api', path='/:id', requires={'subdomain': ('api', 'v2')})
+        assert matchers.disjoint(www, api)
+        assert not matchers.disjoint(get, www)
+
+    def test_literals(self):
+        about = routes.Literal(name='about', path='/about')
+        contact = routes.Literal(name='contact', path='/contact')
+        assert matchers.disjoint(about, contact)
+        assert not matchers.disjoint(about, routes.Literal(name='same', path='/about'))
+        assert not matchers.disjoint(about, routes.Segment(name='any', path='/:page'))
+        assert matchers.disjoint(routes.Segment(name='user', path='/user/:id'), about)
+        assert matchers.disjoint(about, routes.Segment(name='wildcard', regex='^/static/.*'))
+
+    def test_segments(self):
+        def segment(path, **kwargs):
+            return routes.Segment(name=path, path=path, **kwargs)
+        assert matchers.disjoint(segment('/user/:id'), segment('/group/:id'))
+        assert matchers.disjoint(segment('/user/:id'), segment('/user/:id/edit'))
+        assert not matchers.disjoint(segment('/user/:id'), segment('/:section/:id'))
+        assert not matchers.disjoint(segment('/user[/:id]'), segment('/:section/:id'))
+        assert matchers.disjoint(segment('/user[/:id]'), segment('/user/:id/:action/edit'))
+        greedy = segment('/files/:path', requires={'path': '.*'})
+        assert not matchers.disjoint(greedy, segment('/files/:id/edit'))
+        assert matchers.disjoint(greedy, segment('/images/:id/edit'))
+        assert not matchers.disjoint(
+            segment('/user/:id'), routes.Segment(name='regex', regex='^/group/.*'))
+        compiled = routes.Segment(name='compiled', path='/group', regex=re.compile('/group/.*'))
+        assert not matchers.disjoint(segment('/group/:id'), compiled)
+        assert not matchers.disjoint(compiled, segment('/user/:id'))
+
+
+class TestAdaptive(object):
+    def test_moves_hot_routes(self):
+        class Adaptive(matchers.Adaptive):
+            interval = 5
+
+        router = routers.Dict({
+            'a': {'path': '/a/:id'},
+            'b': {'path': '/b/:id'},
+            'z': {'path': '/z/:id'},
+            'any': {'path': '/:section/:id'},
+            'high': {'path': '/:id', 'priority': 2},
+        }, matcher=Adaptive)
+        order = [route.name for route in router.matcher.order]
+        assert order == ['high', 'z', 'b', 'a', 'any']
+        for _ in range(3):
+            router.match(sample_request(PATH_INFO='/a/1'))
+        for _ in range(2):
+            assert router.match(sample_request(PATH_INFO='/c/1')).route.name == 'any'
+        order = [route.name for route in router.matcher.order]
+        assert order == ['high', 'a', 'z', 'b', 'any']
+        assert router.matcher._hits[router.routes['a']] == 1
+        assert router.match(sample_request(PATH_INFO='/z/1')).route.name == 'z'
+
+    def test_wrapped_matcher(self):
+        class Adaptive(matchers.Adaptive):
+            matcher_class = matchers.Regex
+            interval = 2
+
+        adaptive = routers.Dict(sample_routes(), matcher=Adaptive)
+        adaptive.warm()
+        linear = routers.Dict(sample_routes())
+        for _ in range(3):
+            for path in sample_paths():
+                request = sample_request(PATH_INFO=path)
+                expected = [m.route.name for m in linear.matches(request)]
+                assert [m.route.name for m in adaptive.matches(request)] == expected
+        assert list(adaptive.matcher.candidates(sample_request(PATH_INFO='/user/1')))
+
+    def test_regex_with_path(self):
+        class Adaptive(matchers.Adaptive):
+            interval = 2
+
+        definitions = {
+            'compiled': {'path': '/a', 'regex': re.compile(r'/a/\d+')},
+            'a': {'path': '/a/:id'},
+            'b': {'path': '/b/:id'},
+        }
+        adaptive = routers.Dict(definitions, matcher=Adaptive)
+        linear = routers.Dict(definitions)
+        for _ in range(3):
+            for path in ('/a/1', '/a/b', '/b/1', '/b/1', '/a/b'):
+                request = sample_request(PATH_INFO=path)
+                expected = [m.route.name for m in linear.matches(request)]
+                assert [m.route.name for m in adaptive.matches(request)] == expected
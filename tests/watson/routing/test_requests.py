@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from watson.routing import requests, routes
+
+
+class TestPathRequest(object):
+    def test_create(self):
+        request = requests.PathRequest('get', '/search', host='www.test.com',
+                                       accept='text/xml', query_string='q=1')
+        assert request.method == 'GET'
+        assert request.environ['PATH_INFO'] == '/search'
+        assert request.environ['HTTP_ACCEPT'] == 'text/xml'
+        assert request.url.subdomain == 'www'
+        assert request.get['q'] == '1'
+        assert repr(request) == '<watson.routing.requests.PathRequest method:GET path:/search>'
+
+    def test_no_host(self):
+        request = requests.PathRequest('GET', '/')
+        assert request.url.subdomain is None
+        assert not request.get
+        assert 'HTTP_ACCEPT' not in request.environ
+
+    def test_match(self):
+        route = routes.Literal(
+            name='home', path='/', requires={'subdomain': 'clients', 'format': 'xml'})
+        assert route.match(requests.PathRequest(
+            'GET', '/', host='clients.test.com', accept='text/xml'))
+        assert not route.match(requests.PathRequest('GET', '/', host='test.com'))
+
+
+def sample_scope(**kwargs):
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'www.test.com'), (b'accept', b'text/xml')],
+        'server': ('127.0.0.1', 8000),
+    }
+    scope.update(kwargs)
+    return scope
+
+
+class TestScopeRequest(object):
+    def test_create(self):
+        request = requests.ScopeRequest(sample_scope(
+            method='post', path='/app/search', root_path='/app', query_string=b'q=1'))
+        assert request.method == 'POST'
+        assert request.environ['PATH_INFO'] == '/search'
+        assert request.environ['SCRIPT_NAME'] == '/app'
+        assert request.environ['HTTP_ACCEPT'] == 'text/xml'
+        assert request.url.subdomain == 'www'
+        assert request.get['q'] == '1'
+        assert repr(request) == '<watson.routing.requests.ScopeRequest method:POST path:/search>'
+
+    def test_environ(self):
+        request = requests.ScopeRequest(sample_scope(headers=[
+            (b'accept', b'text/html'), (b'accept', b'text/xml'), (b'x-custom', b'1')]))
+        assert request.environ['HTTP_ACCEPT'] == 'text/html,text/xml'
+        assert request.environ['HTTP_X_CUSTOM'] == '1'
+        assert request.environ.get('HTTP_MISSING') is None
+        assert 'CONTENT_TYPE' not in request.environ
+        assert len(request.environ) == 6
+        assert dict(request.environ)['QUERY_STRING'] == ''
+
+    def test_host_from_server(self):
+        request = requests.ScopeRequest(sample_scope(headers=[], server=('api.test.com', 80)))
+        assert request.url.subdomain == 'api'
+        request = requests.ScopeRequest({'type': 'websocket', 'path': '/'})
+        assert request.method == 'GET'
+        assert request.url.subdomain is None
+        assert not request.get
+
+    def test_match(self):
+        route = routes.Literal(
+            name='home', path='/', requires={'subdomain': 'www', 'format': 'xml'})
+        assert route.match(requests.ScopeRequest(sample_scope()))
+        assert not route.match(requests.ScopeRequest(sample_scope(headers=[])))
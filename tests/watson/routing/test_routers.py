@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
-from watson.routing import routers
+import asyncio
+import re
+import threading
+from watson.routing import matchers, routers
 from pytest import raises
 from tests.watson.routing.support import sample_request
 
@@ -56,6 +59,46 @@ class TestDict(object):
         assert route_match.route.requires['test'] == '\w+'
         assert len(router) == 3
 
+    def test_insertion_order(self):
+        definitions = [
+            {'name': 'r{0}'.format(i), 'path': '/{0}'.format(path), 'priority': priority}
+            for i, (path, priority) in enumerate(
+                (('a', 1), ('b', 2), ('a', 1), ('c', 1), ('b', 2), ('a', 3),
+                 ('z', 1), (':id', 1), ('a', 1), ('c', 0)))]
+        router = routers.Dict()
+        for definition in definitions:
+            router.add_definition(definition)
+        expected = reversed(sorted(
+            [router.routes[d['name']] for d in definitions],
+            key=lambda r: (r.priority, r.path_or_regex)))
+        assert list(router.routes.values()) == list(expected)
+        assert [name for name, route in router] == list(router.routes)
+
+    def test_same_key_most_recent_first(self):
+        router = routers.Dict()
+        for name in ('a', 'b'):
+            router.add_definition({'name': name, 'path': '/x'})
+        router.match(sample_request(PATH_INFO='/x'))
+        router.add_definition({'name': 'c', 'path': '/x'})
+        assert list(router.routes) == ['c', 'b', 'a']
+        router.add_definition({'name': 'a', 'path': '/x'})
+        assert list(router.routes) == ['a', 'c', 'b']
+
+    def test_replace_route(self):
+        router = routers.Dict({'home': {'path': '/'}, 'about': {'path': '/about'}})
+        router.add_definition({'name': 'home', 'path': '/zzz'})
+        assert list(router.routes) == ['home', 'about']
+        assert len(router) == 2
+        assert router.assemble('home') == '/zzz'
+
+    def test_regex_and_path_routes(self):
+        router = routers.Dict({
+            'home': {'path': '/'},
+            'wildcard': {'regex': '^/.*'},
+            'compiled': {'regex': re.compile('^/test')},
+        })
+        assert list(router.routes) == ['compiled', 'wildcard', 'home']
+
     def test_match_route(self):
         request = sample_request()
         router = routers.Dict({
@@ -91,6 +134,45 @@ class TestDict(object):
         with raises(StopIteration):
             next(router.matches(request))
 
+    def test_lazy(self):
+        router = routers.Dict({
+            'home': {'path': '/'},
+            'user': {'path': '/user/:id', 'children': {'edit': {'path': '/edit'}}},
+        }, lazy=True)
+        assert router.routes['user']._regex is None
+        assert router.match(sample_request(PATH_INFO='/user/1/edit')).route.name == 'user/edit'
+        assert router.routes['user']._regex is None
+        router.warm()
+        assert router.routes['user']._regex is not None
+
+    def test_lazy_regex(self):
+        router = routers.Dict({
+            'static': {'regex': '^/static/.*'},
+            'assets': {'regex': '^/assets/.*'},
+        }, lazy=True)
+        assert router.routes['static']._regex is None
+        assert [name for name, route in router] == ['static', 'assets']
+        assert router.match(sample_request(PATH_INFO='/assets/a.css')).route.name == 'assets'
+
+    def test_match_many(self):
+        router = routers.Dict({
+            'home': {'path': '/'},
+            'user': {'path': '/user/:id', 'requires': {'subdomain': 'admin'}},
+            'search': {'path': '/search', 'accepts': ('POST',), 'cacheable': False},
+        })
+        requests = [
+            ('GET', '/'),
+            ('GET', '/user/1', 'admin.test.com'),
+            sample_request(PATH_INFO='/user/1', HTTP_HOST='admin.test.com'),
+            ('GET', '/user/1', 'www.test.com'),
+            ('POST', '/search'),
+            ('GET', '/'),
+        ]
+        results = list(router.match_many(iter(requests)))
+        names = [match.route.name if match else None for match in results]
+        assert names == ['home', 'user', 'user', None, 'search', 'home']
+        assert results[1].params is not results[2].params
+
     def test_assemble(self):
         router = routers.Dict({
             'home': {
@@ -101,6 +183,95 @@ class TestDict(object):
         with raises(KeyError):
             router.assemble('no_route')
 
+    def test_assemble_many(self):
+        router = routers.Dict({'search': {'path': '/search/:keyword[/:page]'}})
+        urls = router.assemble_many('search', (
+            {'keyword': keyword, 'query_string': {'q': 'a&b c', 'tag': ['x', 'y']}}
+            for keyword in ('one', 'two')))
+        assert next(urls) == '/search/one?q=a%26b+c&tag=x&tag=y'
+        assert list(urls) == ['/search/two?q=a%26b+c&tag=x&tag=y']
+        urls = router.assemble_many('search', [
+            {'keyword': 'one', 'page': 2},
+            {'keyword': 'two', 'query_string': {'a': 1, 'b': 2}},
+        ], separator='&amp;')
+        assert list(urls) == ['/search/one/2', '/search/two?a=1&amp;b=2']
+        with raises(KeyError):
+            router.assemble_many('no_route', [])
+
+
+class TestMatchCache(object):
+    def test_lru(self):
+        cache = routers.MatchCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == (True, 1)
+        cache.set('c', 3)
+        assert cache.get('b') == (False, None)
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+        assert repr(cache) == '<watson.routing.routers.MatchCache size:2 hits:1 misses:1 evictions:1>'
+        cache.clear()
+        assert not len(cache)
+
+    def test_generation(self):
+        cache = routers.MatchCache(2)
+        generation = cache.generation
+        cache.clear()
+        cache.set('a', 1, generation)
+        assert cache.get('a') == (False, None)
+        cache.set('a', 1, cache.generation)
+        assert cache.get('a') == (True, 1)
+
+    def test_router_cache(self):
+        router = routers.Dict({
+            'home': {'path': '/'},
+            'search': {'path': '/search', 'requires': {'page': r'\d+'}}
+        }, cache_size=10)
+        assert router.match(sample_request()).route.name == 'home'
+        match = router.match(sample_request())
+        assert match.route.name == 'home'
+        assert (router.cache.hits, router.cache.misses) == (1, 1)
+        match.params['changed'] = True
+        assert 'changed' not in router.match(sample_request()).params
+        request = sample_request(PATH_INFO='/search', QUERY_STRING='page=1')
+        assert router.match(request).params == {'page': '1'}
+        request = sample_request(PATH_INFO='/search', QUERY_STRING='page=2')
+        assert router.match(request).params == {'page': '2'}
+        request = sample_request(PATH_INFO='/search', QUERY_STRING='page=a')
+        assert not router.match(request)
+        assert not router.match(request)
+        assert router.cache.hits == 3
+
+    def test_invalidated_when_route_added(self):
+        router = routers.Dict({'home': {'path': '/'}}, cache_size=10)
+        request = sample_request(PATH_INFO='/about')
+        assert not router.match(request)
+        router.add_definition({'name': 'about', 'path': '/about'})
+        assert not len(router.cache)
+        assert router.match(request).route.name == 'about'
+
+    def test_uncacheable_routes(self):
+        router = routers.Dict({
+            'home': {'path': '/', 'priority': 3},
+            'dynamic': {'path': '/dynamic', 'cacheable': False, 'priority': 2},
+            'about': {'path': '/about'},
+        }, cache_size=10)
+        router.match(sample_request())
+        router.match(sample_request(PATH_INFO='/dynamic'))
+        router.match(sample_request(PATH_INFO='/about'))
+        router.match(sample_request(PATH_INFO='/missing'))
+        assert len(router.cache) == 1
+
+    def test_subdomain_and_format_in_key(self):
+        router = routers.Dict({
+            'xml': {'path': '/', 'requires': {'format': 'xml', 'subdomain': 'api'}},
+        }, cache_size=10)
+        request = sample_request(HTTP_HOST='api.test.com', HTTP_ACCEPT='text/xml')
+        assert router.match(request)
+        assert not router.match(sample_request(HTTP_HOST='api.test.com'))
+        assert not router.match(sample_request(HTTP_ACCEPT='text/xml'))
+        assert len(router.cache) == 3
+
 
 class TestList(object):
     def test_create(self):
@@ -140,6 +311,110 @@ class TestList(object):
         assert len(router) == 2
 
 
+class TestConcurrency(object):
+    def test_snapshot_unchanged_by_add(self):
+        router = routers.Dict({'home': {'path': '/'}})
+        routes, matcher = router.routes, router.matcher
+        router.add_definition({'name': 'about', 'path': '/about'})
+        assert list(routes) == ['home']
+        assert len(matcher) == 1
+        assert list(router.routes) == ['about', 'home']
+        assert router.matcher is not matcher
+
+    def test_add_while_matching(self):
+        router = routers.Dict({'home': {'path': '/'}}, cache_size=100)
+        errors = []
+
+        def add():
+            for i in range(200):
+                router.add_definition({'name': 'page{0}'.format(i), 'path': '/page{0}/:id'.format(i)})
+
+        def match():
+            try:
+                for i in range(200):
+                    assert router.match(sample_request()).route.name == 'home'
+                    for name, route in router:
+                        assert name == route.name
+            except Exception as exc:  # pragma: no cover
+                errors.append(exc)
+
+        threads = [threading.Thread(target=add)] + [
+            threading.Thread(target=match) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert len(router) == 201
+        assert router.match(sample_request(PATH_INFO='/page199/1')).route.name == 'page199'
+
+
+class TestFreeze(object):
+    def test_freeze(self):
+        router = routers.Dict({
+            'home': {'path': '/'},
+            'user': {'path': '/user/:id', 'requires': {'id': r'\d+'}},
+        }, cache_size=10)
+        assert not router.frozen
+        match = router.freeze()
+        assert router.frozen
+        assert 'def match(request):' in match.source
+        assert router.match(sample_request(PATH_INFO='/user/1')).params == {'id': '1'}
+        assert list(router.match_many([('GET', '/'), ('GET', '/user/a')]))[1] is None
+        router.thaw()
+        assert not router.frozen
+        assert router.match(sample_request(PATH_INFO='/user/1')).route.name == 'user'
+
+    def test_matcher_retained(self):
+        router = routers.Dict({'home': {'path': '/'}, 'user': {'path': '/user/:id'}},
+                              matcher=matchers.Trie)
+        match = router.freeze()
+        assert 'candidates(request)' in match.source
+        assert router.match(sample_request(PATH_INFO='/user/1')).route.name == 'user'
+        for matcher in (matchers.Regex, matchers.Adaptive):
+            with raises(TypeError):
+                routers.Dict({'home': {'path': '/'}}, matcher=matcher).freeze()
+
+    def test_thawed_by_changes(self):
+        router = routers.Dict({'home': {'path': '/'}})
+        router.freeze()
+        router.add_definition({'name': 'about', 'path': '/about'})
+        assert not router.frozen
+        assert router.match(sample_request(PATH_INFO='/about')).route.name == 'about'
+
+    def test_choice(self):
+        first = routers.Dict({'home': {'path': '/'}})
+        second = routers.Dict({'home': {'path': '/'}, 'about': {'path': '/about'}})
+        router = routers.Choice(first, second)
+        router.freeze()
+        assert router.match(sample_request()).route is first.routes['home']
+        second.add_definition({'name': 'contact', 'path': '/contact'})
+        assert not router.frozen
+        assert router.match(sample_request(PATH_INFO='/contact')).route.name == 'contact'
+
+
+class TestScope(object):
+    def test_match_scope(self):
+        router = routers.Dict({'user': {'path': '/user/:id', 'requires': {'subdomain': 'www'}}})
+        scope = {'type': 'http', 'method': 'GET', 'path': '/user/1',
+                 'headers': [(b'host', b'www.test.com')]}
+        match = router.match(scope)
+        assert match.route.name == 'user'
+        assert match.params == {'id': '1'}
+        assert [m.route.name for m in router.matches(scope)] == ['user']
+        assert list(router.match_many([scope, ('GET', '/user/1', 'test.com')]))[1] is None
+
+    def test_match_async(self):
+        router = routers.Choice(routers.Dict({'home': {'path': '/'}}))
+        loop = asyncio.new_event_loop()
+        try:
+            match = loop.run_until_complete(
+                router.match_async({'type': 'http', 'method': 'GET', 'path': '/'}))
+        finally:
+            loop.close()
+        assert match.route.name == 'home'
+
+
 class TestChoice(object):
 
     def test_invalid(self):
@@ -178,6 +453,62 @@ class TestChoice(object):
         assert len(router) == 2
         assert not router.match(sample_request(PATH_INFO='/test'))
 
+    def test_merged_index(self):
+        dict_router = routers.Dict({
+            'home': {'path': '/'},
+            'user': {'path': '/user/:id', 'priority': 2},
+        })
+        list_router = routers.List([
+            {'name': 'home', 'path': '/'},
+            {'name': 'any', 'path': '/:section/:id', 'priority': 3},
+        ])
+        router = routers.Choice(dict_router, list_router, matcher=matchers.Trie)
+        assert len(router) == 4
+        assert 'any' in router
+        assert 'missing' not in router
+        request = sample_request(PATH_INFO='/user/1')
+        assert [m.route.name for m in router.matches(request)] == ['user', 'any']
+        assert router.match(sample_request()).route is dict_router.routes['home']
+        list_router.add_definition({'name': 'about', 'path': '/about'})
+        assert len(router) == 5
+        assert router.match(sample_request(PATH_INFO='/about')).route.name == 'about'
+
+    def test_nested(self):
+        inner = routers.Choice(routers.Dict({'inner': {'path': '/inner'}}))
+        router = routers.Choice(inner, routers.Dict({'outer': {'path': '/outer'}}))
+        assert len(router) == 2
+        assert router.match(sample_request(PATH_INFO='/inner')).route.name == 'inner'
+        inner.add_router(routers.Dict({'added': {'path': '/added'}}))
+        assert 'added' in router
+        assert router.match(sample_request(PATH_INFO='/added')).route.name == 'added'
+
+    def test_warm(self):
+        dict_router = routers.Dict({'user': {'path': '/user/:id'}}, lazy=True)
+        router = routers.Choice(dict_router)
+        router.warm()
+        assert dict_router.routes['user']._regex is not None
+
+    def test_match_many(self):
+        router = routers.Choice(
+            routers.Dict({'dict': {'path': '/dict'}}),
+            routers.List([{'name': 'list', 'path': '/list'}]))
+        results = router.match_many([('GET', '/list'), ('GET', '/dict'), ('GET', '/')])
+        assert [match.route.name if match else None for match in results] == [
+            'list', 'dict', None]
+
+    def test_cache(self):
+        dict_router = routers.Dict({'dict': {'path': '/dict'}})
+        router = routers.Choice(dict_router, cache_size=10)
+        request = sample_request(PATH_INFO='/list')
+        assert not router.match(request)
+        assert not router.match(request)
+        assert router.cache.hits == 1
+        router.add_router(routers.List([{'name': 'list', 'path': '/list'}]))
+        assert router.match(request).route.name == 'list'
+        dict_router.add_definition({'name': 'list', 'path': '/list'})
+        assert router.match(request).route.name == 'list'
+        assert router.match(request).route is dict_router.routes['list']
+
     def test_assemble(self):
         list_router = routers.List([
             {'name': 'list', 'path': '/list'}
@@ -188,3 +519,17 @@ class TestChoice(object):
             router.assemble('invalid')
         assert router.assemble('list', query_string={'page': 1}) == '/list?page=1'
         assert 'order=desc' in router.assemble('list', query_string={'page': 1, 'order': 'desc'})
+
+    def test_assemble_first_router_wins(self):
+        first = routers.Dict({'home': {'path': '/'}})
+        second = routers.Dict({'home': {'path': '/home'}, 'about': {'path': '/about'}})
+        router = routers.Choice(first, second)
+        assert router.assemble('home') == '/'
+        assert router.assemble('about') == '/about'
+        assert 'contact' not in router
+        second.add_definition({'name': 'contact', 'path': '/contact'})
+        assert router.assemble('contact') == '/contact'
+        router.add_router(routers.Dict({'team': {'path': '/team'}}))
+        assert 'team' in router
+        assert router.assemble('team') == '/team'
+        assert router._snapshot().named['home'] is first.routes['home']
@@ -1,4 +1,9 @@
 # -*- coding: utf-8 -*-
+import collections
+import itertools
+import re
+import tracemalloc
+import uuid
 from pytest import raises
 from tests.watson.routing import support
 from watson.http import REQUEST_METHODS
@@ -18,6 +23,7 @@ class TestBase(object):
         assert not route.defaults
         assert not route.options
         assert route.priority == 1
+        assert route.cacheable
         assert route.name == 'home'
         assert route.path == '/'
         assert route.requires['format']
@@ -70,6 +76,38 @@ class TestLiteral(object):
             name='home', path='/', requires={'format': 'xml'})
         assert not route.match(support.sample_request(HTTP_ACCEPT='text/json'))
 
+    def test_format_from_accept_list(self):
+        route = routes.Literal(
+            name='home', path='/', requires={'format': 'json|xml'})
+        match = route.match(support.sample_request(
+            HTTP_ACCEPT='text/html,text/xml;q=0.8,application/json;q=0.9'))
+        assert match.params['format'] == 'json'
+        match = route.match(support.sample_request(
+            HTTP_ACCEPT='text/html, application/json;q=0, text/xml'))
+        assert match.params['format'] == 'xml'
+        assert not route.match(support.sample_request(HTTP_ACCEPT='text/html,*/*;q=0.8'))
+        assert not route.match(support.sample_request())
+
+    def test_rejected_by(self):
+        route = routes.Literal(
+            name='home', path='/', accepts=('GET',),
+            requires={'subdomain': 'www', 'format': 'xml', 'page': r'\d+'})
+        request = support.sample_request
+        assert route.rejected_by(request(PATH_INFO='/about')) == 'path'
+        assert route.rejected_by(request(REQUEST_METHOD='POST')) == 'method'
+        assert route.rejected_by(request(HTTP_HOST='api.test.com')) == 'subdomain'
+        assert route.rejected_by(request(HTTP_HOST='www.test.com')) == 'format'
+        assert route.rejected_by(request(
+            HTTP_HOST='www.test.com', HTTP_ACCEPT='text/xml', QUERY_STRING='page=a')) == 'query'
+        assert route.rejected_by(request(
+            HTTP_HOST='www.test.com', HTTP_ACCEPT='text/xml', QUERY_STRING='page=1')) is None
+
+    def test_formats_from_accept(self):
+        assert routes.formats_from_accept(None) == ()
+        assert routes.formats_from_accept('text/xml;q=0.5, application/json') == ('json', 'xml')
+        assert routes.formats_from_accept('text/xml;q=abc') == ()
+        assert routes.formats_from_accept('TEXT/XML; level=1') == ('xml',)
+
     def test_get_match(self):
         request = support.sample_request(QUERY_STRING='test=blah')
         route = routes.Literal(
@@ -83,6 +121,34 @@ class TestLiteral(object):
         match = route.match(request)
         assert not match
 
+    def test_requirements_precompiled(self):
+        route = routes.Literal(
+            name='home', path='/', requires={'page': r'\d+', 'format': 'json', 'subdomain': 'www'},
+            defaults={'page': 1})
+        assert route._predicates == (routes._subdomain_met, routes._format_met, routes._query_met)
+        assert routes.Literal(name='home', path='/')._predicates == ()
+        request = support.sample_request(
+            HTTP_HOST='www.test.com', HTTP_ACCEPT='application/json', QUERY_STRING='page=2')
+        assert route.match(request).params == {'page': '2', 'format': 'json'}
+        assert route.defaults == {'page': 1}
+
+    def test_rejected_without_allocating(self):
+        route = routes.Literal(name='home', path='/', requires={'subdomain': 'www'},
+                               defaults={'page': 1})
+        requests = [support.sample_request(PATH_INFO='/about'),
+                    support.sample_request(REQUEST_METHOD='PATCH', HTTP_HOST='api.test.com')]
+        for request in requests:
+            assert not route.match(request)
+        tracemalloc.start()
+        try:
+            for _ in range(100):
+                for request in requests:
+                    route.match(request)
+            allocated, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert allocated < 1024
+
     def test_assemble(self):
         route = routes.Literal(name='home', path='/')
         assert route.assemble() == '/'
@@ -95,6 +161,13 @@ class TestSegment(object):
         assert route
         assert repr(route) == '<watson.routing.routes.Segment name:home path:/ match:/$>'
 
+    def test_rejected_by(self):
+        route = routes.Segment(name='user', path='/user/:id', accepts=('GET',))
+        assert route.rejected_by(support.sample_request(PATH_INFO='/user')) == 'path'
+        request = support.sample_request(PATH_INFO='/user/1', REQUEST_METHOD='POST')
+        assert route.rejected_by(request) == 'method'
+        assert route.rejected_by(support.sample_request(PATH_INFO='/user/1')) is None
+
     def test_create_regex_instead_of_path(self):
         with raises(TypeError):
             routes.Segment(name='home')
@@ -105,6 +178,8 @@ class TestSegment(object):
     def test_match_regex(self):
         route = routes.Segment(name='wildcard', regex='^/.*')
         assert route.match(support.sample_request(PATH_INFO='/test'))
+        route = routes.Segment(name='compiled', regex=re.compile('^/.*'))
+        assert route.match(support.sample_request(PATH_INFO='/test'))
 
     def test_builder(self):
         assert routes.Segment.builder(name='test', path='/:test')
@@ -137,6 +212,27 @@ class TestSegment(object):
         request = support.sample_request(PATH_INFO='/about')
         assert route.match(request).params['company'] == 'test'
 
+    def test_lazy(self):
+        route = routes.Segment(name='home', path='/about[/:company]', lazy=True)
+        assert route._regex is None
+        assert route.match(support.sample_request(PATH_INFO='/about/test'))
+        assert route._regex is not None
+        route = routes.Segment(name='home', path='/about[/:company]', lazy=True)
+        assert route.assemble(company='test') == '/about/test'
+        route = routes.Segment(name='home', path='/search:keyword]', lazy=True)
+        with raises(ValueError):
+            route.compile()
+        route = routes.Segment(name='home', regex='/test', lazy=True)
+        assert repr(route) == '<watson.routing.routes.Segment name:home match:/test$>'
+
+    def test_match_groups(self):
+        route = routes.Segment(name='home', path='/about[/:company]',
+                               defaults={'company': 'test'}, accepts=('GET',))
+        request = support.sample_request(PATH_INFO='/about')
+        assert route.match_groups(request, {'company': None}).params['company'] == 'test'
+        request = support.sample_request(PATH_INFO='/about', REQUEST_METHOD='POST')
+        assert not route.match_groups(request, {'company': None})
+
     def test_segment_bracket_mismatch(self):
         with raises(ValueError):
             routes.Segment(name='mismatch', path='/search:keyword]')
@@ -157,3 +253,70 @@ class TestSegment(object):
         assert optional_nested.assemble(company='testing', test='blah') == '/about/testing/blah'
         with raises(KeyError):
             route.assemble()
+
+    def test_assembler_matches_path_from_segments(self):
+        paths = ('/', '/:a', '/x/:a/y/:b', '/{x}/:a', '/x[/:a]', '/x[/:a[/:b]]',
+                 '/x[/:a/:b]', '/x[/:a][/:b]', '/x[/:a]/:b', '[:a]', '/x[/y[/:a]]', '/:a[/:b]')
+        values = (None, '', 0, 'v', 1)
+        for path in paths:
+            segments = routes.segments_from_path(path)
+            assembler = routes.assembler_from_segments(segments)
+            for a, b, default in itertools.product(values, values, values):
+                kwargs = {k: v for k, v in (('a', a), ('b', b)) if v is not None}
+                defaults = {'b': default} if default is not None else {}
+                try:
+                    expected = routes.path_from_segments(
+                        segments, collections.ChainMap(kwargs, defaults))
+                except KeyError as exc:
+                    with raises(KeyError) as actual:
+                        assembler(kwargs, defaults)
+                    assert str(actual.value) == str(exc)
+                else:
+                    assert assembler(kwargs, defaults) == expected
+
+    def test_converters(self):
+        route = routes.Segment(name='user', path='/user/:id<int>[/:key<uuid>]')
+        assert route.segments == [
+            ('static', '/user/'), ('segment', 'id'),
+            ('optional', [('static', '/'), ('segment', 'key')])]
+        assert route.converters == {
+            'id': routes.converters['int'], 'key': routes.converters['uuid']}
+        match = route.match(support.sample_request(PATH_INFO='/user/12'))
+        assert match.params == {'id': 12, 'key': None}
+        key = '12345678-1234-5678-1234-567812345678'
+        match = route.match(support.sample_request(PATH_INFO='/user/12/' + key))
+        assert match.params['key'] == uuid.UUID(key)
+        assert not route.match(support.sample_request(PATH_INFO='/user/abc'))
+        assert not route.match(support.sample_request(PATH_INFO='/user/12/abc'))
+        assert route.assemble(id=12) == '/user/12'
+        assert route.assemble(id=12, key=uuid.UUID(key)) == '/user/12/' + key
+
+    def test_assemble_falsy_converted(self):
+        route = routes.Segment(name='user', path='/user/:id<int>')
+        assert route.match(support.sample_request(PATH_INFO='/user/0')).params == {'id': 0}
+        assert route.assemble(id=0) == '/user/0'
+        with raises(KeyError):
+            route.assemble(id=None)
+        route = routes.Segment(name='user', path='/user[/:id<int>]', defaults={'id': None})
+        assert route.assemble(id=0) == '/user/0'
+        assert route.assemble() == '/user'
+        with raises(KeyError):
+            routes.Segment(name='page', path='/page/:name').assemble(name='')
+
+    def test_converter_requires(self):
+        route = routes.Segment(
+            name='files', path='/files/:path<path>/:version<int>', requires={'version': r'\d'})
+        match = route.match(support.sample_request(PATH_INFO='/files/a/b.txt/1'))
+        assert match.params == {'path': 'a/b.txt', 'version': 1}
+        assert not route.match(support.sample_request(PATH_INFO='/files/a/b.txt/10'))
+        assert routes.Segment(name='slug', path='/:slug<slug>', lazy=True).match(
+            support.sample_request(PATH_INFO='/a-slug_1'))
+
+    def test_invalid_converter(self):
+        with raises(ValueError):
+            routes.Segment(name='user', path='/user/:id<float>')
+
+    def test_failed_conversion(self):
+        route = routes.Segment(name='user', path='/user/:id<int>', requires={'id': '.+'})
+        assert route.match(support.sample_request(PATH_INFO='/user/1')).params == {'id': 1}
+        assert not route.match(support.sample_request(PATH_INFO='/user/a'))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import pickle
+from pytest import raises
+from watson.routing import matchers, routers, routes, snapshots
+from tests.watson.routing.support import sample_request
+
+
+def sample_definitions():
+    return {
+        'home': {'path': '/'},
+        'user': {'path': '/user/:id', 'requires': {'id': r'\d+'}},
+        'about': {
+            'path': '/about[/:company]',
+            'defaults': {'company': 'acme'},
+            'children': {'team': {'path': '/team'}}
+        }
+    }
+
+
+class TestSnapshots(object):
+    def test_definitions_hash(self):
+        digest = snapshots.definitions_hash(sample_definitions())
+        assert digest == snapshots.definitions_hash(sample_definitions())
+        changed = sample_definitions()
+        changed['home']['path'] = '/home'
+        assert digest != snapshots.definitions_hash(changed)
+
+    def test_load_or_build(self, tmpdir):
+        filename = str(tmpdir.join('routes.snapshot'))
+        built = snapshots.load_or_build(routers.Dict, sample_definitions(), filename)
+        assert tmpdir.join('routes.snapshot').check()
+        loaded = snapshots.load_or_build(
+            routers.Dict, sample_definitions(), filename, matcher=matchers.Trie)
+        assert loaded is not built
+        assert loaded.matcher.__class__ is matchers.Trie
+        assert list(loaded.routes) == list(built.routes)
+        match = loaded.match(sample_request(PATH_INFO='/user/1'))
+        assert match.route.name == 'user'
+        assert loaded.assemble('about') == '/about/acme'
+        assert loaded.routes['about']._regex is None
+        assert loaded.routes['user'].regex.pattern == built.routes['user'].regex.pattern
+
+    def test_rebuild_when_changed(self, tmpdir):
+        filename = str(tmpdir.join('routes.snapshot'))
+        snapshots.load_or_build(routers.Dict, sample_definitions(), filename)
+        changed = sample_definitions()
+        changed['contact'] = {'path': '/contact'}
+        router = snapshots.load_or_build(routers.Dict, changed, filename)
+        assert 'contact' in router
+        digest = snapshots.definitions_hash(sample_definitions())
+        assert not snapshots.load(filename, digest)
+
+    def test_failed_dump(self, tmpdir):
+        router = routers.Dict({'home': {'path': '/', 'defaults': {'f': lambda: None}}})
+        with raises(Exception):
+            snapshots.dump(router, str(tmpdir.join('routes.snapshot')), 'abc')
+        assert not tmpdir.listdir()
+
+    def test_invalid_snapshots(self, tmpdir):
+        filename = tmpdir.join('routes.snapshot')
+        assert not snapshots.load(str(filename), 'abc')
+        filename.write('invalid')
+        assert not snapshots.load(str(filename), 'abc')
+        filename.write_binary(pickle.dumps({'version': 0}))
+        assert not snapshots.load(str(filename), 'abc')
+
+
+class TestPickleRoutes(object):
+    def test_segment(self):
+        route = routes.Segment(name='home', path='/about[/:company]', requires={'company': r'\w+'})
+        loaded = pickle.loads(pickle.dumps(route))
+        assert loaded.segments == route.segments
+        assert loaded.assemble(company='test') == '/about/test'
+        assert loaded.match(sample_request(PATH_INFO='/about/test'))
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+import collections
+from watson.routing import matchers
+from watson.routing.routes import Literal, Segment
+from watson.common.imports import get_qualified_name
+
+__all__ = ('Analysis', 'covers')
+
+# Matches any single path component
+_any = '\x00\x00'
+
+
+def _requirements_cover(first, second):
+    """Determine whether every request meeting the requirements of second meets first.
+    """
+    if not matchers._accepted_methods(second) <= matchers._accepted_methods(first):
+        return False
+    if first.subdomains is not None and (
+            second.subdomains is None or not second.subdomains <= first.subdomains):
+        return False
+    if first._formats is not None and (
+            second._formats is None or not second._formats <= first._formats):
+        return False
+    if first._query_regexes is not None:
+        # Only the same requirements are guaranteed to accept the query string
+        if second._query_regexes is None:
+            return False
+        for key, regex in first._query_regexes.items():
+            other = second._query_regexes.get(key)
+            if other is None or other.pattern != regex.pattern:
+                return False
+    return True
+
+
+def _optionals_last(segments):
+    # Each optional group ends with $ (see regex_from_segments), so a path
+    # can only continue beyond one that matched when it is the last element.
+    for index, (type_, value) in enumerate(segments):
+        if type_ == 'optional' and (
+                index != len(segments) - 1 or not _optionals_last(value)):
+            return False
+    return True
+
+
+def _component_patterns(route):
+    """Retrieve the components of every path a Segment route could match.
+
+    Segments are replaced with a marker along with their requirement, so that
+    components can be compared as strings, and a component made up of a
+    single segment without a requirement is replaced with _any.
+
+    Returns:
+        list: A tuple of components for each path, or None if the paths of
+            the route cannot be determined, a segment could contain a / or
+            an optional group is followed by anything else.
+    """
+    segments = matchers._path_segments(route)
+    if (segments is None or matchers._spanning_segments(route)
+            or not _optionals_last(segments)):  # noqa
+        return None
+    try:
+        expansions = matchers._expand_segments(segments)
+    except ValueError:
+        return None
+    patterns = []
+    for segments in expansions:
+        parts = []
+        for type_, value in segments:
+            if type_ == 'static':
+                parts.append(value)
+            else:
+                converter = route.converters.get(value)
+                parts.append('\x00{0}\x00'.format(converter.regex if converter else ''))
+        patterns.append(tuple(''.join(parts).split('/')))
+    return patterns
+
+
+def _pattern_covers(first, second):
+    if len(first) != len(second):
+        return False
+    for a, b in zip(first, second):
+        if a != b and not (a == _any and b):
+            return False
+    return True
+
+
+def covers(first, second, patterns=None):
+    """Determine whether the first route matches every request the second route matches.
+
+    This is conservative, False is returned whenever it cannot be proven (for
+    example for routes with query string requirements that differ).
+
+    Args:
+        first (watson.routing.routes.Base): The first route.
+        second (watson.routing.routes.Base): The second route.
+        patterns (dict): A cache of the paths of routes, see _component_patterns.
+
+    Returns:
+        boolean: Whether or not the second route is covered by the first.
+    """
+    # Subclasses may match requests in any way
+    if type(first) not in (Literal, Segment) or type(second) not in (Literal, Segment):
+        return False
+    if not _requirements_cover(first, second):
+        return False
+    if type(second) is Literal:
+        if type(first) is Literal:
+            return first.path == second.path
+        matches = first.regex.match(second.path)
+        return bool(matches) and first._route_match(
+            dict(first.defaults), matches.groupdict()) is not None
+    if type(first) is Literal:
+        return False
+    if (first.regex.pattern == second.regex.pattern
+            and first.converters == second.converters):  # noqa
+        return True
+    if patterns is None:
+        patterns = {}
+    for route in (first, second):
+        if route not in patterns:
+            patterns[route] = _component_patterns(route)
+    if patterns[first] is None or patterns[second] is None:
+        return False
+    return all(any(_pattern_covers(a, b) for a in patterns[first]) for b in patterns[second])
+
+
+def _first_components(route, shapes):
+    """Retrieve the first components of the paths a route could match.
+
+    Returns:
+        set: The components, or None if the route could match any path.
+    """
+    if isinstance(route, Literal):
+        if route.path.startswith('/'):
+            return {route.path.split('/')[1]}
+        return None
+    if route not in shapes:
+        shapes[route] = matchers._path_shapes(route)
+    if shapes[route] is None:
+        return None
+    components = set()
+    for shape, prefixed in shapes[route]:
+        if len(shape) < 2 or shape[1] is None:
+            return None
+        components.add(shape[1])
+    return components
+
+
+class Analysis(object):
+    """Compares every route with the routes of a higher priority.
+
+    Routes are only compared when they could match a request with the same
+    first path component (or when either could match any path), and are then
+    compared with matchers.disjoint and covers.
+
+    Example:
+
+    .. code-block:: python
+
+        analysis = router.analyse(prune=True)
+        analysis.as_dict()
+
+    Attributes:
+        routes (tuple): The routes in priority order.
+        shadowed (OrderedDict): The routes that can never be matched, along
+            with the first route of a higher priority that covers them.
+        overlapping (dict): The routes of a lower priority (in priority order)
+            that may match the same requests as each route.
+    """
+    __slots__ = ('routes', 'shadowed', 'overlapping')
+
+    def __init__(self, routes):
+        self.routes = tuple(routes)
+        self.shadowed = collections.OrderedDict()
+        overlapping = {route: [] for route in self.routes}
+        shapes, patterns = {}, {}
+        positions = {route: position for position, route in enumerate(self.routes)}
+        by_component, anywhere = collections.defaultdict(list), []
+        for route in self.routes:
+            components = _first_components(route, shapes)
+            if components is None:
+                previous = self.routes[:positions[route]]
+            else:
+                previous = set(anywhere)
+                for component in components:
+                    previous.update(by_component[component])
+                previous = sorted(previous, key=positions.__getitem__)
+            for other in previous:
+                if matchers.disjoint(other, route, shapes):
+                    continue
+                overlapping[other].append(route)
+                if route not in self.shadowed and covers(other, route, patterns):
+                    self.shadowed[route] = other
+            if components is None:
+                anywhere.append(route)
+            else:
+                for component in components:
+                    by_component[component].append(route)
+        self.overlapping = {route: frozenset(others) for route, others in overlapping.items()}
+
+    @property
+    def reachable(self):
+        """The routes that are not shadowed, in priority order.
+        """
+        return tuple(route for route in self.routes if route not in self.shadowed)
+
+    def disjoint(self, first, second):
+        """Determine whether two routes were found to never match the same request.
+
+        Args:
+            first (watson.routing.routes.Base): The first route.
+            second (watson.routing.routes.Base): The second route.
+
+        Returns:
+            boolean: Whether or not the routes are disjoint.
+        """
+        return second not in self.overlapping[first] and first not in self.overlapping[second]
+
+    def as_dict(self):
+        """Exports the analysis by route name.
+
+        Returns:
+            dict: The shadowed routes (and the route shadowing them), the
+                routes each route overlaps with, and the routes that are
+                disjoint from every other route.
+        """
+        overlaps = collections.defaultdict(set)
+        for route, others in self.overlapping.items():
+            for other in others:
+                overlaps[route.name].add(other.name)
+                overlaps[other.name].add(route.name)
+        return {
+            'shadowed': {route.name: other.name for route, other in self.shadowed.items()},
+            'overlapping': {name: sorted(names) for name, names in overlaps.items()},
+            'disjoint': [route.name for route in self.routes if route.name not in overlaps],
+        }
+
+    def __repr__(self):
+        return '<{0} routes:{1} shadowed:{2}>'.format(
+            get_qualified_name(self), len(self.routes), len(self.shadowed))
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+from watson.routing.matchers import _accepted_methods
+from watson.routing.routes import Literal, Segment, RouteMatch, formats_from_accept
+
+__all__ = ('compile_match', 'source_from_routes')
+
+_unset = object()
+
+
+def _first_format(accepted, formats):
+    for format in accepted:
+        if format in formats:
+            return format
+    return None
+
+
+def _query_params(get, regexes, params):
+    for key, value in get.items():
+        regex = regexes.get(key, None)
+        if regex:
+            if regex.match(value):
+                params[key] = value
+            else:
+                return False
+    return True
+
+
+class _Shared(object):
+    """The parts of a request that are read on first use and shared by later routes.
+    """
+    __slots__ = ('subdomain', 'accepted', 'get')
+
+    def __init__(self):
+        self.subdomain = self.accepted = self.get = _unset
+
+
+class _Writer(object):
+    """Accumulates indented lines of source code.
+    """
+    __slots__ = ('lines', 'depth')
+
+    def __init__(self):
+        self.lines = []
+        self.depth = 0
+
+    def line(self, line):
+        self.lines.append('    ' * self.depth + line)
+
+    def block(self, line):
+        self.line(line)
+        self.depth += 1
+
+
+def _specialised(route):
+    # Subclasses may override any part of matching, so are matched as is
+    return type(route) in (Literal, Segment)
+
+
+def _shares(route):
+    # Whether the route reads any part of the request that is shared
+    return _specialised(route) and (
+        route.subdomains is not None or route._formats is not None
+        or route._query_regexes is not None)  # noqa
+
+
+def _write_route(writer, index, route, namespace):
+    # Writes a function that matches the route, given the method, path and
+    # the parts of the request shared between routes
+    name = 'route_{0}'.format(index)
+    namespace[name] = route
+    writer.line('')
+    writer.line('')
+    writer.line('# {0!r}'.format(route.name))
+    writer.block('def match_{0}(request, method, path, shared):'.format(index))
+    if not _specialised(route):
+        writer.line('return {0}.match(request)'.format(name))
+        writer.depth = 0
+        return
+    namespace['accepts_{0}'.format(index)] = frozenset(_accepted_methods(route))
+    writer.block('if method in accepts_{0}:'.format(index))
+    if isinstance(route, Literal):
+        writer.block('if path == {0!r}:'.format(route.path))
+    else:
+        namespace['regex_{0}'.format(index)] = route.regex
+        writer.line('matches = regex_{0}.match(path)'.format(index))
+        writer.block('if matches:')
+    if route.subdomains is not None:
+        namespace['subdomains_{0}'.format(index)] = route.subdomains
+        writer.block('if shared.subdomain is _unset:')
+        writer.line('shared.subdomain = request.url.subdomain')
+        writer.depth -= 1
+        writer.block('if shared.subdomain in subdomains_{0}:'.format(index))
+    if route._formats is not None:
+        namespace['formats_{0}'.format(index)] = route._formats
+        writer.block('if shared.accepted is _unset:')
+        writer.line("shared.accepted = formats_from_accept(request.environ.get('HTTP_ACCEPT'))")
+        writer.depth -= 1
+        writer.line('format = _first_format(shared.accepted, formats_{0})'.format(index))
+        writer.block('if format is not None:')
+    if route.defaults:
+        namespace['defaults_{0}'.format(index)] = route.defaults
+        writer.line('params = dict(defaults_{0})'.format(index))
+    else:
+        writer.line('params = {}')
+    if route._formats is not None:
+        writer.line("params['format'] = format")
+    if route._query_regexes is not None:
+        namespace['regexes_{0}'.format(index)] = route._query_regexes
+        writer.block("if method == 'GET' and shared.get is _unset:")
+        writer.line('shared.get = request.get')
+        writer.depth -= 1
+        writer.block(
+            "if method != 'GET' or not shared.get or _query_params("
+            "shared.get, regexes_{0}, params):".format(index))
+    if isinstance(route, Literal):
+        writer.line('return RouteMatch({0}, params)'.format(name))
+    else:
+        writer.line('route_match = {0}._route_match(params, matches.groupdict())'.format(name))
+        writer.block('if route_match is not None:')
+        writer.line('return route_match')
+    writer.depth = 1
+    writer.line('return None')
+    writer.depth = 0
+
+
+def source_from_routes(routes, candidates=None):
+    """Generates the source of a function that matches a request against the routes.
+
+    Args:
+        routes (list): The routes, in the order they should be matched.
+        candidates (callable): Retrieves the routes that could match a
+            request, for example the candidates method of a matcher.
+
+    Returns:
+        tuple: The source code, and the namespace it must be executed in.
+    """
+    namespace = {
+        '_first_format': _first_format,
+        '_query_params': _query_params,
+        'formats_from_accept': formats_from_accept,
+        'RouteMatch': RouteMatch,
+        'candidates': candidates,
+        '_Shared': _Shared,
+        '_unset': _unset,
+    }
+    writer = _Writer()
+    for index, route in enumerate(routes):
+        _write_route(writer, index, route, namespace)
+    writer.line('')
+    writer.line('')
+    writer.line('by_route = {{{0}}}'.format(', '.join(
+        'route_{0}: match_{0}'.format(index) for index in range(len(routes)))))
+    writer.line('ordered = ({0})'.format(''.join(
+        'match_{0}, '.format(index) for index in range(len(routes)))))
+    writer.line('')
+    writer.line('')
+    writer.block('def match(request):')
+    writer.line('method = request.method')
+    writer.line("path = request.environ['PATH_INFO']")
+    writer.line('shared = {0}'.format('_Shared()' if any(map(_shares, routes)) else 'None'))
+    if candidates is None:
+        writer.block('for match_route in ordered:')
+    else:
+        writer.block('for route in candidates(request):')
+        writer.line('match_route = by_route[route]')
+    writer.line('route_match = match_route(request, method, path, shared)')
+    writer.block('if route_match:')
+    writer.line('return route_match')
+    writer.depth = 1
+    writer.line('return None')
+    return '\n'.join(writer.lines).lstrip('\n') + '\n', namespace
+
+
+def compile_match(routes, candidates=None):
+    """Compiles the routes into a function that matches a request.
+
+    Each route is reduced to a function that only performs the checks it
+    requires (method, path and then any subdomain, format or query string
+    requirements), with the method and path of the request read once, and
+    the subdomain, parsed Accept header and query string read on first use
+    and shared by later routes. Routes
+    that are subclasses of Literal or Segment are matched by calling their
+    match method.
+
+    When candidates is given (usually the candidates method of the matcher
+    of a router) only the routes it returns are matched, so the narrowing of
+    the matcher is retained, otherwise every route is matched in turn. The
+    function returns the same RouteMatch as matching each of the candidates
+    in turn, and the source it was generated from is available as its
+    'source' attribute.
+
+    Args:
+        routes (list): The routes, in the order they should be matched.
+        candidates (callable): Retrieves the routes that could match a
+            request, in priority order.
+
+    Returns:
+        callable: A function accepting a request and returning a RouteMatch
+            or None.
+    """
+    source, namespace = source_from_routes(routes, candidates)
+    code = compile(source, '<watson.routing.frozen>', 'exec')
+    exec(code, namespace)
+    match = namespace['match']
+    match.source = source
+    return match
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import collections
+import threading
+from watson.common.imports import get_qualified_name
+
+__all__ = ('Base', 'Counters')
+
+
+class Base(object):
+    """Receives details of the requests matched by a router.
+
+    Instruments are only called by routers that were created with one, and
+    only from router.match(). Subclass this to forward the details to a
+    metrics pipeline as they happen.
+
+    Example:
+
+    .. code-block:: python
+
+        instrument = instruments.Counters()
+        router = routers.Dict(routes, instrument=instrument)
+        router.match(request)
+        instrument.as_dict()
+    """
+    __slots__ = ()
+
+    def rejected(self, route, reason):
+        """Called for each route that was tried and did not match.
+
+        Args:
+            route (watson.routing.routes.Base): The route that was tried.
+            reason (string): The requirement that was not met, one of 'method',
+                'subdomain', 'format', 'query' or 'path'.
+        """
+        pass
+
+    def matched(self, request, route_match, tried, duration):
+        """Called once the router has finished matching a request.
+
+        Args:
+            request (watson.http.messages.Request): The request.
+            route_match (RouteMatch): The match, or None if nothing matched.
+            tried (int): The number of routes tried (0 if the result was
+                retrieved from the cache of the router).
+            duration (float): The seconds spent matching the request.
+        """
+        pass
+
+
+class Counters(Base):
+    """Accumulates counters for the requests matched by a router.
+
+    Attributes:
+        requests (int): The number of requests matched.
+        misses (int): The number of requests that did not match a route.
+        tried (int): The total number of routes tried.
+        duration (float): The total seconds spent matching requests.
+        hits (Counter): The number of matches per route name.
+        rejections (Counter): The number of rejections per reason.
+    """
+    __slots__ = ('requests', 'misses', 'tried', 'duration', 'hits',
+                 'rejections', '_lock')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def rejected(self, route, reason):
+        with self._lock:
+            self.rejections[reason] += 1
+
+    def matched(self, request, route_match, tried, duration):
+        with self._lock:
+            self.requests += 1
+            self.tried += tried
+            self.duration += duration
+            if route_match:
+                self.hits[route_match.route.name] += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        """Resets all the counters to zero.
+        """
+        with self._lock:
+            self.requests = self.misses = self.tried = 0
+            self.duration = 0.0
+            self.hits = collections.Counter()
+            self.rejections = collections.Counter()
+
+    def as_dict(self):
+        """Exports the counters, for example to be sent to a metrics service.
+
+        Returns:
+            dict: The counters, along with the average number of routes tried
+                and the average duration of each request.
+        """
+        with self._lock:
+            requests = self.requests or 1
+            return {
+                'requests': self.requests,
+                'misses': self.misses,
+                'tried': self.tried,
+                'tried_per_request': self.tried / requests,
+                'duration': self.duration,
+                'duration_per_request': self.duration / requests,
+                'hits': dict(self.hits),
+                'rejections': dict(self.rejections),
+            }
+
+    def __repr__(self):
+        return '<{0} requests:{1} misses:{2} tried:{3}>'.format(
+            get_qualified_name(self), self.requests, self.misses, self.tried)
@@ -0,0 +1,881 @@
+# -*- coding: utf-8 -*-
+import abc
+import collections
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from watson.routing.routes import Literal, Segment
+
+__all__ = ('Base', 'Linear', 'Trie', 'Regex', 'Adaptive', 'Mapped', 'disjoint')
+
+
+class Base(metaclass=abc.ABCMeta):
+    """Narrows the routes on a router down to those that could match a request.
+
+    Matchers are built from the sorted routes of a router and are discarded
+    whenever the router changes. They only ever need to return a superset of
+    the routes that would match, in priority order, as each candidate is still
+    matched against the request.
+
+    Attributes:
+        routes (tuple): The routes in priority order.
+    """
+    __slots__ = ('routes',)
+
+    def __init__(self, routes):
+        self.routes = tuple(routes)
+
+    @abc.abstractmethod
+    def candidates(self, request):
+        """Retrieve the routes that could match the request.
+
+        Args:
+            request (watson.http.messages.Request): The request to match.
+
+        Returns:
+            An iterable of routes in priority order.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def matches(self, request):
+        """Match a request against the candidate routes.
+
+        Args:
+            request (watson.http.messages.Request): The request to match.
+
+        Returns:
+            A generator of RouteMatch namedtuples.
+        """
+        for route in self.candidates(request):
+            route_match = route.match(request)
+            if route_match:
+                yield route_match
+
+    def warm(self):
+        """Builds anything that would otherwise be built on first use.
+        """
+        pass
+
+    def __len__(self):
+        return len(self.routes)
+
+
+def _accepted_methods(route):
+    accepts = route.accepts
+    return {accepts} if isinstance(accepts, str) else set(accepts)
+
+
+class Linear(Base):
+    """Every route is a candidate for every request.
+
+    Literal routes are the exception, as they are only a candidate for the
+    exact path they are defined with. They are indexed by that path so that a
+    single dict lookup retrieves them, and they are then merged in priority
+    order with the remaining routes.
+
+    The remaining routes are partitioned by the request methods they accept,
+    so that a request is never matched against a route that does not accept
+    its method. Routes that require a subdomain are further bucketed by
+    (method, subdomain), so the subdomain of a request is only determined
+    once, and only the routes for that subdomain are merged with the routes
+    that have no subdomain requirement.
+    """
+    __slots__ = ('_literals', '_dynamic', '_methods', '_subdomains', '_positions')
+
+    def __init__(self, routes):
+        super(Linear, self).__init__(routes)
+        self._literals = {}
+        self._methods = {}
+        self._subdomains = {}
+        dynamic = []
+        for route in self.routes:
+            if isinstance(route, Literal):
+                self._literals.setdefault(route.path, []).append(route)
+                continue
+            dynamic.append(route)
+            subdomains = route.subdomains
+            for method in _accepted_methods(route):
+                if subdomains is None:
+                    self._methods.setdefault(method, []).append(route)
+                else:
+                    for subdomain in subdomains:
+                        self._subdomains.setdefault((method, subdomain), []).append(route)
+        self._dynamic = tuple(dynamic)
+        self._positions = {route: position for position, route in enumerate(self.routes)}
+
+    def candidates(self, request):
+        method = request.method
+        dynamic = self._methods.get(method, ())
+        if self._subdomains:
+            dynamic = self._merge(
+                dynamic, self._subdomains.get((method, request.url.subdomain)))
+        return self._merge(
+            self._literals.get(request.environ['PATH_INFO']), dynamic)
+
+    def _merge(self, first, second):
+        if not first:
+            return second or ()
+        if not second:
+            return first
+        return heapq.merge(first, second, key=self._positions.__getitem__)
+
+
+class _Node(object):
+    __slots__ = ('children', 'wildcard', 'exact', 'prefixed')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.exact = set()
+        self.prefixed = set()
+
+    def child(self, component):
+        if component is None:
+            if self.wildcard is None:
+                self.wildcard = _Node()
+            return self.wildcard
+        node = self.children.get(component)
+        if node is None:
+            node = self.children[component] = _Node()
+        return node
+
+
+# Marks where a segment sits within a path while it is being split.
+_segment_marker = '\x00'
+# The maximum number of paths a route with optional segments may expand to
+# before it is treated as a candidate for every request instead.
+max_expansions = 64
+
+
+def _expand_segments(segments):
+    """Expands optional segments into every path they could produce.
+
+    Returns:
+        list: Lists of ('static', value) and ('segment', name) tuples.
+    """
+    expansions = [[]]
+    for type_, value in segments:
+        if type_ == 'optional':
+            optional = _expand_segments(value)
+            expansions = [
+                expansion + extra for expansion in expansions
+                for extra in [[]] + optional]
+        else:
+            expansions = [expansion + [(type_, value)] for expansion in expansions]
+        if len(expansions) > max_expansions:
+            raise ValueError('Too many optional segments to expand.')
+    return expansions
+
+
+def _path_segments(route):
+    """Retrieve the segments of a Segment route that describe its path.
+
+    Returns:
+        list: The segments, or None if the route is matched by a regex instead
+            (a compiled regex has no segments, and the segments of a regex
+            given as a string do not describe a path).
+    """
+    if not isinstance(route, Segment) or not route.path or not route.path.startswith('/'):
+        return None
+    source = getattr(route, '_source', None)
+    if route.segments is None or not source or not source.startswith('/'):
+        return None
+    return route.segments
+
+
+def _spanning_segments(route):
+    """Retrieve the names of the segments of a route that may contain a /.
+
+    Segments with a custom requirement are assumed to, as are segments whose
+    converter can match a /.
+    """
+    names = set(route.requires)
+    for name, converter in route.converters.items():
+        if '/' in converter.regex or re.match('(?:{0})$'.format(converter.regex), '/'):
+            names.add(name)
+    return names
+
+
+def _components_from_segments(segments, requires):
+    """Converts an expanded list of segments into path components.
+
+    Components that contain a segment are returned as None (matching any
+    single component). If a segment has a custom requirement that could span
+    multiple components (see _spanning_segments), the components are
+    truncated and the route treated as matching any path beneath them.
+
+    Returns:
+        tuple: A list of components, and whether or not they are a prefix.
+    """
+    parts = []
+    for type_, value in segments:
+        if type_ == 'static':
+            parts.append(value)
+        elif value in requires:
+            components = ''.join(parts).split('/')[:-1]
+            return [None if _segment_marker in c else c for c in components], True
+        else:
+            parts.append(_segment_marker)
+    components = ''.join(parts).split('/')
+    return [None if _segment_marker in c else c for c in components], False
+
+
+class Trie(Base):
+    """Walks the request path one / separated component at a time.
+
+    Literal paths and the segments of Segment routes are split into
+    their components and stored in a trie, so that the cost of finding the
+    candidates for a request depends on the depth of the path rather than
+    the number of routes on the router. Routes that cannot be expressed as
+    components (user supplied regular expressions, custom route types) are
+    always returned as candidates, provided they accept the request method
+    (and subdomain).
+    """
+    __slots__ = ('_root', '_accepts', '_subdomains')
+
+    def __init__(self, routes):
+        super(Trie, self).__init__(routes)
+        self._root = _Node()
+        self._accepts = tuple(_accepted_methods(route) for route in self.routes)
+        self._subdomains = tuple(route.subdomains for route in self.routes)
+        if not any(self._subdomains):
+            self._subdomains = None
+        for position, route in enumerate(self.routes):
+            self._add(position, route)
+
+    def _add(self, position, route):
+        if isinstance(route, Literal):
+            self._insert(position, route.path.split('/'), False)
+            return
+        segments = _path_segments(route)
+        if segments is None:
+            self._root.prefixed.add(position)
+            return
+        try:
+            expansions = _expand_segments(segments)
+        except ValueError:
+            self._root.prefixed.add(position)
+            return
+        spanning = _spanning_segments(route)
+        for segments in expansions:
+            self._insert(
+                position, *_components_from_segments(segments, spanning))
+
+    def _insert(self, position, components, prefixed):
+        node = self._root
+        for component in components:
+            node = node.child(component)
+        if prefixed:
+            node.prefixed.add(position)
+        else:
+            node.exact.add(position)
+
+    def candidates(self, request):
+        path = request.environ['PATH_INFO']
+        if path.endswith('\n'):
+            # A regex $ will also match prior to a trailing newline
+            positions = range(len(self.routes))
+        else:
+            positions = self._positions(path)
+        method = request.method
+        candidates = [position for position in sorted(positions)
+                      if method in self._accepts[position]]
+        if self._subdomains:
+            subdomain = request.url.subdomain
+            candidates = [position for position in candidates
+                          if self._subdomains[position] is None
+                          or subdomain in self._subdomains[position]]  # noqa
+        return [self.routes[position] for position in candidates]
+
+    def _positions(self, path):
+        positions = set(self._root.prefixed)
+        nodes = [self._root]
+        for component in path.split('/'):
+            next_nodes = []
+            for node in nodes:
+                child = node.children.get(component)
+                if child is not None:
+                    next_nodes.append(child)
+                if node.wildcard is not None:
+                    next_nodes.append(node.wildcard)
+            if not next_nodes:
+                break
+            for node in next_nodes:
+                positions.update(node.prefixed)
+            nodes = next_nodes
+        else:
+            for node in nodes:
+                positions.update(node.exact)
+        return positions
+
+
+_named_group_pattern = re.compile(r'\(\?P<')
+_backreference_pattern = re.compile(r'\(\?P=|\(\?\(|\\[1-9]')
+
+
+def _combinable(route):
+    """Determine whether the regex of a route can be part of an alternation.
+
+    Only the regex generated from the path of a Segment route is combined,
+    and only if any custom requirements do not contain unnamed groups,
+    backreferences or conditional group references which would change
+    meaning within a larger pattern.
+    """
+    if not isinstance(route, Segment) or not route.path or not route.path.startswith('/'):
+        return False
+    regex = route.regex
+    return (regex.groups == len(regex.groupindex)
+            and not _backreference_pattern.search(regex.pattern))  # noqa
+
+
+class _Alternation(object):
+    """A run of Segment routes that are matched with a single regex.
+
+    Each route is wrapped in a group named _<index>, and the groups of the
+    route are prefixed with _<index>_ to keep them unique. The name of the
+    last group to match (the wrapping group) identifies the route.
+    """
+    __slots__ = ('positions', 'routes', 'groups', '_regex')
+
+    def __init__(self, entries):
+        self.positions, self.routes = zip(*entries)
+        self.groups = tuple(
+            tuple((name, '_{0}_{1}'.format(index, name)) for name in route.regex.groupindex)
+            for index, route in enumerate(self.routes))
+        self._regex = None
+
+    @property
+    def regex(self):
+        if self._regex is None:
+            self.compile()
+        return self._regex
+
+    def compile(self):
+        if self._regex is None:
+            self._regex = re.compile('|'.join(
+                '(?P<_{0}>{1})'.format(
+                    index,
+                    _named_group_pattern.sub('(?P<_{0}_'.format(index), route.regex.pattern))
+                for index, route in enumerate(self.routes)))
+
+    def matches(self, path):
+        """Retrieve the routes in the alternation that match the path.
+
+        Returns:
+            A generator of (position, route, groups) tuples.
+        """
+        matches = self.regex.match(path)
+        if not matches:
+            return
+        index = int(matches.lastgroup[1:])
+        yield (self.positions[index], self.routes[index],
+               {name: matches.group(group) for name, group in self.groups[index]})
+        # Any routes after the first match in the alternation are only
+        # reached when the first fails on its other requirements.
+        for index in range(index + 1, len(self.routes)):
+            route = self.routes[index]
+            route_matches = route.regex.match(path)
+            if route_matches:
+                yield self.positions[index], route, route_matches.groupdict()
+
+
+class Regex(Linear):
+    """Matches the paths of many Segment routes with a single regex.
+
+    Consecutive Segment routes are compiled into alternations of up to
+    chunk_size routes, so that a single call to the regex engine finds the
+    first route whose path matches. The parameters of the route are then
+    taken from that same match. Alternations are built separately for each
+    request method (and subdomain) the first time it is seen. Literal routes
+    are indexed by path as they are in Linear, and routes whose regex cannot
+    be safely combined are matched individually.
+
+    Attributes:
+        chunk_size (int): The maximum number of routes in an alternation.
+    """
+    __slots__ = ('_blocks',)
+    chunk_size = 64
+
+    def __init__(self, routes):
+        super(Regex, self).__init__(routes)
+        self._blocks = {}
+
+    def _blocks_for(self, key):
+        """Retrieve the alternations for the routes accepting a method.
+
+        The blocks for each request method are only built the first time a
+        request with that method is matched.
+
+        Args:
+            key: Either a request method, or a (method, subdomain) tuple for
+                the routes that require that subdomain.
+        """
+        blocks = self._blocks.get(key)
+        if blocks is not None:
+            return blocks
+        routes = self._subdomains if isinstance(key, tuple) else self._methods
+        blocks, entries = [], []
+        for route in routes.get(key, ()):
+            position = self._positions[route]
+            if _combinable(route):
+                entries.append((position, route))
+                if len(entries) == self.chunk_size:
+                    blocks.append(_Alternation(entries))
+                    entries = []
+            else:
+                if entries:
+                    blocks.append(_Alternation(entries))
+                    entries = []
+                blocks.append((position, route))
+        if entries:
+            blocks.append(_Alternation(entries))
+        self._blocks[key] = blocks
+        return blocks
+
+    def warm(self):
+        for key in list(self._methods) + list(self._subdomains):
+            for block in self._blocks_for(key):
+                if isinstance(block, _Alternation):
+                    block.compile()
+
+    def _path_matches(self, key, path):
+        for block in self._blocks_for(key):
+            if isinstance(block, _Alternation):
+                for path_match in block.matches(path):
+                    yield path_match
+            else:
+                position, route = block
+                yield position, route, None
+
+    def matches(self, request):
+        path = request.environ['PATH_INFO']
+        method = request.method
+        candidates = self._path_matches(method, path)
+        if self._subdomains:
+            key = (method, request.url.subdomain)
+            if key in self._subdomains:
+                candidates = heapq.merge(candidates, self._path_matches(key, path))
+        literals = self._literals.get(path)
+        if literals:
+            candidates = heapq.merge(
+                [(self._positions[route], route, None) for route in literals],
+                candidates)
+        for position, route, groups in candidates:
+            if groups is None:
+                route_match = route.match(request)
+            else:
+                route_match = route.match_groups(request, groups)
+            if route_match:
+                yield route_match
+
+
+def _path_shapes(route):
+    """Retrieve the components of every path a Segment route could match.
+
+    Returns:
+        list: (components, prefixed) tuples as per _components_from_segments,
+            or None if the paths of the route cannot be determined.
+    """
+    segments = _path_segments(route)
+    if segments is None:
+        return None
+    try:
+        expansions = _expand_segments(segments)
+    except ValueError:
+        return None
+    spanning = _spanning_segments(route)
+    return [_components_from_segments(segments, spanning)
+            for segments in expansions]
+
+
+def _shapes_disjoint(first, second):
+    first_components, first_prefixed = first
+    second_components, second_prefixed = second
+    for a, b in zip(first_components, second_components):
+        if a is not None and b is not None and a != b:
+            return True
+    return (not first_prefixed and not second_prefixed
+            and len(first_components) != len(second_components))  # noqa
+
+
+def disjoint(first, second, shapes=None):
+    """Determine whether two routes can never match the same request.
+
+    This is conservative, False is returned whenever it cannot be proven that
+    the routes are disjoint (for example routes defined with a regex).
+
+    Args:
+        first (watson.routing.routes.Base): The first route.
+        second (watson.routing.routes.Base): The second route.
+        shapes (dict): A cache of the paths of routes, see _path_shapes.
+
+    Returns:
+        boolean: Whether or not the routes are disjoint.
+    """
+    if not _accepted_methods(first) & _accepted_methods(second):
+        return True
+    first_subdomains, second_subdomains = first.subdomains, second.subdomains
+    if (first_subdomains is not None and second_subdomains is not None
+            and not first_subdomains & second_subdomains):  # noqa
+        return True
+    first_literal, second_literal = isinstance(first, Literal), isinstance(second, Literal)
+    if first_literal and second_literal:
+        return first.path != second.path
+    if first_literal or second_literal:
+        literal, other = (first, second) if first_literal else (second, first)
+        return isinstance(other, Segment) and not other.regex.match(literal.path)
+    if shapes is None:
+        shapes = {}
+    for route in (first, second):
+        if route not in shapes:
+            shapes[route] = _path_shapes(route)
+    if shapes[first] is None or shapes[second] is None:
+        return False
+    return all(_shapes_disjoint(a, b) for a in shapes[first] for b in shapes[second])
+
+
+class Adaptive(Base):
+    """Moves the most frequently matched routes ahead of others of the same priority.
+
+    Wraps another matcher, counting the route that each request matches.
+    After every interval matches the wrapped matcher is rebuilt with each
+    route that has been matched moved ahead of less frequently matched routes
+    of the same priority, provided it is disjoint (see disjoint) from every
+    route it is moved ahead of. The route that matches a request therefore
+    never changes, only how many routes are tried before it is found.
+    Counts are halved after each rebuild so that the order follows changes
+    in traffic, and are approximate when matching from multiple threads.
+
+    Example:
+
+    .. code-block:: python
+
+        class HotTrie(matchers.Adaptive):
+            matcher_class = matchers.Trie
+            interval = 10000
+
+        router = routers.Dict(routes, matcher=HotTrie)
+
+    Attributes:
+        matcher_class (class): The matcher to wrap.
+        interval (int): The number of matches between each rebuild.
+    """
+    __slots__ = ('_matcher', '_hits', '_count', '_shapes', '_disjoint', '_lock')
+    matcher_class = Linear
+    interval = 1000
+
+    def __init__(self, routes):
+        super(Adaptive, self).__init__(routes)
+        self._matcher = self.matcher_class(self.routes)
+        self._hits = collections.Counter()
+        self._count = 0
+        self._shapes = {}
+        self._disjoint = {}
+        self._lock = threading.Lock()
+
+    @property
+    def order(self):
+        """The routes in the order they are currently tried.
+        """
+        return self._matcher.routes
+
+    def candidates(self, request):
+        return self._matcher.candidates(request)
+
+    def matches(self, request):
+        first = True
+        for route_match in self._matcher.matches(request):
+            if first:
+                first = False
+                self._hits[route_match.route] += 1
+                self._count += 1
+                if self._count >= self.interval:
+                    self.reorder()
+            yield route_match
+
+    def warm(self):
+        self._matcher.warm()
+
+    def reorder(self):
+        """Rebuilds the wrapped matcher from the current counts.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            hits, self._hits, self._count = self._hits, collections.Counter(), 0
+            order = list(self._matcher.routes)
+            positions = {route: position for position, route in enumerate(order)}
+            for route, count in sorted(hits.items(), key=lambda item: (-item[1], positions[item[0]])):
+                index = order.index(route)
+                while index:
+                    previous = order[index - 1]
+                    if (previous.priority != route.priority or hits[previous] >= count
+                            or not self._routes_disjoint(previous, route)):  # noqa
+                        break
+                    order[index - 1], order[index] = route, previous
+                    index -= 1
+            self._matcher = self.matcher_class(order)
+            self._hits.update({route: count // 2 for route, count in hits.items() if count > 1})
+        finally:
+            self._lock.release()
+
+    def _routes_disjoint(self, first, second):
+        key = (first, second)
+        result = self._disjoint.get(key)
+        if result is None:
+            result = self._disjoint[key] = disjoint(first, second, self._shapes)
+        return result
+
+
+# The layout of a Mapped index, all integers are little endian unsigned ints.
+#
+# header: magic, digest of the routes, route count, node count, method count
+#         and the offset of each of the sections below
+# methods: (string offset, length) of each method name
+# nodes: children (start, count), wildcard node, exact positions (start,
+#        count) and prefixed positions (start, count)
+# children: (string offset, length, node) sorted by the component
+# positions: route positions
+# accepts: a bitmask of the methods accepted by each route
+# strings: utf-8 encoded method names and path components
+_mapped_magic = b'WRM1'
+_mapped_header = struct.Struct('<4s32s9I')
+_mapped_node = struct.Struct('<7I')
+_mapped_pair = struct.Struct('<2I')
+_mapped_child = struct.Struct('<3I')
+_mapped_uint = struct.Struct('<I')
+_no_node = 0xFFFFFFFF
+
+
+def _encode_component(component):
+    return component.encode('utf-8', 'surrogatepass')
+
+
+def _routes_digest(routes):
+    """Generates a digest of the attributes of the routes used by a Mapped index.
+    """
+    digest = hashlib.sha256()
+    for route in routes:
+        path = route.path
+        if not path:
+            path = getattr(route.regex, 'pattern', route.regex)
+        digest.update(repr((
+            type(route).__name__, route.name, path, sorted(_accepted_methods(route)),
+            sorted((k, repr(v)) for k, v in route.requires.items()),
+            sorted(getattr(route, 'converters', {})))).encode('utf-8'))
+    return digest.digest()
+
+
+def _serialize_trie(trie, digest):
+    """Converts the nodes of a Trie into a Mapped index.
+
+    Returns:
+        bytes: The index.
+    """
+    strings = bytearray()
+    string_offsets = {}
+
+    def string(value):
+        encoded = _encode_component(value)
+        if encoded not in string_offsets:
+            string_offsets[encoded] = len(strings)
+            strings.extend(encoded)
+        return string_offsets[encoded], len(encoded)
+
+    nodes, node_ids = [trie._root], {id(trie._root): 0}
+    for node in nodes:
+        for child in [node.children[key] for key in sorted(node.children)] + [node.wildcard]:
+            if child is not None and id(child) not in node_ids:
+                node_ids[id(child)] = len(nodes)
+                nodes.append(child)
+
+    methods = sorted(set().union(*trie._accepts)) if trie._accepts else []
+    method_bits = {method: 1 << bit for bit, method in enumerate(methods)}
+    method_table = b''.join(_mapped_pair.pack(*string(method)) for method in methods)
+    node_table, children, positions = bytearray(), bytearray(), bytearray()
+    for node in nodes:
+        children_start = len(children) // _mapped_child.size
+        entries = sorted((_encode_component(key), child) for key, child in node.children.items())
+        for key, child in entries:
+            offset, length = string(key.decode('utf-8', 'surrogatepass'))
+            children.extend(_mapped_child.pack(offset, length, node_ids[id(child)]))
+        sections = []
+        for values in (node.exact, node.prefixed):
+            sections.extend((len(positions) // _mapped_uint.size, len(values)))
+            for position in sorted(values):
+                positions.extend(_mapped_uint.pack(position))
+        wildcard = _no_node if node.wildcard is None else node_ids[id(node.wildcard)]
+        node_table.extend(_mapped_node.pack(children_start, len(entries), wildcard, *sections))
+    accepts = b''.join(
+        _mapped_uint.pack(sum(method_bits[method] for method in accepted))
+        for accepted in trie._accepts)
+
+    offset = _mapped_header.size
+    offsets = []
+    for section in (method_table, node_table, children, positions, accepts, strings):
+        offsets.append(offset)
+        offset += len(section)
+    header = _mapped_header.pack(
+        _mapped_magic, digest, len(trie.routes), len(nodes), len(methods), *offsets)
+    return b''.join((header, method_table, bytes(node_table), bytes(children),
+                     bytes(positions), accepts, bytes(strings)))
+
+
+def _write_index(filename, data):
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_filename, filename)
+    except Exception:
+        os.unlink(temp_filename)
+        raise
+
+
+def _map_index(filename, digest):
+    """Maps an existing index file, provided it was written for the same routes.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if (len(buffer) < _mapped_header.size
+            or _mapped_header.unpack_from(buffer)[:2] != (_mapped_magic, digest)):  # noqa
+        buffer.close()
+        return None
+    return buffer
+
+
+class Mapped(Base):
+    """Walks the path of a request through a trie stored in a memory map.
+
+    Candidates are found in the same way as the Trie matcher, however the
+    nodes of the trie are serialized into a single read only buffer and read
+    in place, rather than being held as Python objects by each process.
+
+    When filename is set, the index is written to that file (keyed by a digest
+    of the routes, and rewritten when the routes change) and each process
+    maps the file, sharing the same pages of memory. Otherwise the index is
+    written to an anonymous memory map, which is shared with any processes
+    forked after the router is warmed.
+
+    Example:
+
+    .. code-block:: python
+
+        class SharedRoutes(matchers.Mapped):
+            filename = '/var/run/app/routes.index'
+
+        router = routers.Dict(routes, matcher=SharedRoutes)
+        router.warm()  # prior to forking workers
+
+    Attributes:
+        filename (string): The file to store the index in.
+    """
+    __slots__ = ('_buffer', '_header', '_methods', '_subdomains')
+    filename = None
+
+    def __init__(self, routes):
+        super(Mapped, self).__init__(routes)
+        digest = _routes_digest(self.routes)
+        buffer = _map_index(self.filename, digest) if self.filename else None
+        if buffer is None:
+            data = _serialize_trie(Trie(self.routes), digest)
+            if self.filename:
+                _write_index(self.filename, data)
+                buffer = _map_index(self.filename, digest)
+            else:
+                buffer = mmap.mmap(-1, len(data))
+                buffer.write(data)
+        self._buffer = buffer
+        self._header = _mapped_header.unpack_from(buffer)
+        # The subdomains are held by the routes, so are only referenced here
+        self._subdomains = tuple(route.subdomains for route in self.routes)
+        if not any(self._subdomains):
+            self._subdomains = None
+        self._methods = {}
+        method_count, methods_offset, strings_offset = (
+            self._header[4], self._header[5], self._header[10])
+        for bit in range(method_count):
+            offset, length = _mapped_pair.unpack_from(
+                buffer, methods_offset + bit * _mapped_pair.size)
+            start = strings_offset + offset
+            self._methods[buffer[start:start + length].decode('utf-8')] = 1 << bit
+
+    def candidates(self, request):
+        bit = self._methods.get(request.method)
+        if bit is None:
+            return []
+        path = request.environ['PATH_INFO']
+        if path.endswith('\n'):
+            # A regex $ will also match prior to a trailing newline
+            positions = range(len(self.routes))
+        else:
+            positions = self._positions(path)
+        buffer, accepts_offset = self._buffer, self._header[9]
+        candidates = [position for position in sorted(positions)
+                      if _mapped_uint.unpack_from(
+                          buffer, accepts_offset + position * _mapped_uint.size)[0] & bit]
+        if self._subdomains:
+            subdomain = request.url.subdomain
+            candidates = [position for position in candidates
+                          if self._subdomains[position] is None
+                          or subdomain in self._subdomains[position]]  # noqa
+        return [self.routes[position] for position in candidates]
+
+    def _node(self, index):
+        return _mapped_node.unpack_from(
+            self._buffer, self._header[6] + index * _mapped_node.size)
+
+    def _read_positions(self, start, count):
+        offset = self._header[8] + start * _mapped_uint.size
+        return struct.unpack_from('<{0}I'.format(count), self._buffer, offset)
+
+    def _child(self, start, count, component):
+        # A binary search of the children, which are sorted by component
+        buffer = self._buffer
+        children_offset, strings_offset = self._header[7], self._header[10]
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, node = _mapped_child.unpack_from(
+                buffer, children_offset + (start + middle) * _mapped_child.size)
+            key = buffer[strings_offset + offset:strings_offset + offset + length]
+            if key == component:
+                return node
+            if key < component:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _positions(self, path):
+        root = self._node(0)
+        positions = set(self._read_positions(root[5], root[6]))
+        nodes = [root]
+        for component in path.split('/'):
+            component = _encode_component(component)
+            next_nodes = []
+            for node in nodes:
+                children_start, children_count, wildcard = node[:3]
+                child = self._child(children_start, children_count, component)
+                if child is not None:
+                    next_nodes.append(self._node(child))
+                if wildcard != _no_node:
+                    next_nodes.append(self._node(wildcard))
+            if not next_nodes:
+                break
+            for node in next_nodes:
+                positions.update(self._read_positions(node[5], node[6]))
+            nodes = next_nodes
+        else:
+            for node in nodes:
+                positions.update(self._read_positions(node[3], node[4]))
+        return positions
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import collections.abc
+from urllib.parse import parse_qsl
+from watson.common.datastructures import ImmutableMultiDict
+from watson.common.decorators import cached_property
+from watson.common.imports import get_qualified_name
+from watson.http.uri import Url
+
+__all__ = ('PathRequest', 'ScopeRequest')
+
+
+class PathRequest(object):
+    """A lightweight request containing only what a route needs to match.
+
+    Routes only consult the method, path, host, Accept header and query string
+    of a request, so when a full watson.http.messages.Request is not available
+    (or too expensive to create) a PathRequest can be matched instead.
+
+    Example:
+
+    .. code-block:: python
+
+        request = PathRequest('GET', '/search', host='www.example.com')
+        router.match(request)
+    """
+
+    def __init__(self, method, path, host=None, accept=None, query_string=None):
+        self.method = method.upper()
+        self.host = host
+        self.environ = {
+            'REQUEST_METHOD': self.method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query_string or ''
+        }
+        if host:
+            self.environ['HTTP_HOST'] = host
+        if accept:
+            self.environ['HTTP_ACCEPT'] = accept
+
+    @cached_property
+    def url(self):
+        return Url('//{0}'.format(self.host) if self.host else '')
+
+    @cached_property
+    def get(self):
+        return ImmutableMultiDict(
+            parse_qsl(self.environ['QUERY_STRING'], keep_blank_values=True))
+
+    def __repr__(self):
+        return '<{0} method:{1} path:{2}>'.format(
+            get_qualified_name(self), self.method, self.environ['PATH_INFO'])
+
+
+class _ScopeEnviron(collections.abc.Mapping):
+    """A read only WSGI environ, converted from an ASGI scope as keys are accessed.
+    """
+    __slots__ = ('_scope', '_values', '_headers')
+
+    def __init__(self, scope):
+        self._scope = scope
+        self._values = {}
+        self._headers = None
+
+    def _convert(self, key):
+        scope = self._scope
+        if key == 'PATH_INFO':
+            path, root_path = scope['path'], scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            return path
+        if key == 'REQUEST_METHOD':
+            # Websocket scopes have no method, the handshake is always a GET
+            return scope.get('method', 'GET').upper()
+        if key == 'QUERY_STRING':
+            return scope.get('query_string', b'').decode('latin-1')
+        if key == 'SCRIPT_NAME':
+            return scope.get('root_path', '')
+        if key.startswith('HTTP_'):
+            return self._header_values().get(key)
+        return None
+
+    def _header_values(self):
+        if self._headers is None:
+            headers = {}
+            for name, value in self._scope.get('headers', ()):
+                key = 'HTTP_{0}'.format(name.decode('latin-1').upper().replace('-', '_'))
+                value = value.decode('latin-1')
+                headers[key] = '{0},{1}'.format(headers[key], value) if key in headers else value
+            self._headers = headers
+        return self._headers
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = self._convert(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        keys = ['REQUEST_METHOD', 'SCRIPT_NAME', 'PATH_INFO', 'QUERY_STRING']
+        keys.extend(self._header_values())
+        return iter(keys)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+
+class ScopeRequest(object):
+    """A request created from an ASGI http (or websocket) scope.
+
+    Allows an ASGI application to match a request without creating a full
+    watson.http.messages.Request. The path, method, headers and query string
+    are only read from the scope when a route needs them. Routers will
+    automatically convert a scope dict into a ScopeRequest.
+
+    Example:
+
+    .. code-block:: python
+
+        async def app(scope, receive, send):
+            route_match = await router.match_async(scope)
+
+    Attributes:
+        scope (dict): The ASGI scope.
+        environ (Mapping): A read only WSGI style environ for the scope.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.environ = _ScopeEnviron(scope)
+
+    @cached_property
+    def method(self):
+        return self.environ['REQUEST_METHOD']
+
+    @cached_property
+    def host(self):
+        host = self.environ.get('HTTP_HOST')
+        if host is None and self.scope.get('server'):
+            host = self.scope['server'][0]
+        return host
+
+    @cached_property
+    def url(self):
+        return Url('//{0}'.format(self.host) if self.host else '')
+
+    @cached_property
+    def get(self):
+        return ImmutableMultiDict(
+            parse_qsl(self.environ['QUERY_STRING'], keep_blank_values=True))
+
+    def __repr__(self):
+        return '<{0} method:{1} path:{2}>'.format(
+            get_qualified_name(self), self.method, self.environ['PATH_INFO'])
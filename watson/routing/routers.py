@@ -1,34 +1,361 @@
 # -*- coding: utf-8 -*-
 import abc
+import bisect
 import collections
-from watson.routing.routes import BaseRoute, LiteralRoute, SegmentRoute
+import threading
+import time
+from urllib.parse import quote_plus
+from watson.routing import matchers
+from watson.routing.analysis import Analysis
+from watson.routing.frozen import compile_match
+from watson.routing.requests import PathRequest, ScopeRequest
+from watson.routing.routes import BaseRoute, LiteralRoute, SegmentRoute, RouteMatch
 from watson.common.contextmanagers import suppress
 from watson.common.datastructures import dict_deep_update
 from watson.common.imports import get_qualified_name
 
 
+class MatchCache(object):
+
+    """A size bounded, least recently used cache of match results.
+
+    Attributes:
+        size (int): The maximum number of results to store.
+        hits (int): The number of lookups that found a result.
+        misses (int): The number of lookups that did not find a result.
+        evictions (int): The number of results removed to make room.
+        generation (int): Incremented each time the cache is cleared.
+    """
+    size = None
+    hits = 0
+    misses = 0
+    evictions = 0
+    generation = 0
+
+    def __init__(self, size):
+        self.size = size
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Retrieve a result from the cache.
+
+        Returns:
+            tuple: Whether or not the key was found, and the result.
+        """
+        with self._lock:
+            try:
+                result = self._results[key]
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return True, result
+
+    def set(self, key, result, generation=None):
+        """Store a result in the cache.
+
+        Args:
+            key: The key of the result.
+            result: The result to store.
+            generation (int): The generation of the cache when the result was
+                created, the result is discarded if the cache has been cleared
+                since.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.generation += 1
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return (
+            '<{0} size:{1} hits:{2} misses:{3} evictions:{4}>'.format(
+                get_qualified_name(self),
+                self.size,
+                self.hits,
+                self.misses,
+                self.evictions)
+        )
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class _CacheKey(object):
+
+    """Generates the cache key for a request from the attributes the routes consult.
+
+    Only the results of matching routes that precede the first route that is
+    not cacheable can be stored, as any route after it may only have been
+    reached because it did not match.
+    """
+    __slots__ = ('subdomain', 'format', 'query', 'cacheable', 'all_cacheable')
+
+    def __init__(self, routes):
+        self.subdomain = self.format = False
+        query, self.cacheable = set(), set()
+        self.all_cacheable = True
+        for route in routes:
+            self.subdomain = self.subdomain or 'subdomain' in route.requires
+            self.format = self.format or 'format' in route.requires
+            query.update(k for k, v in route.requires.items() if isinstance(v, str))
+            if not route.cacheable:
+                self.all_cacheable = False
+            if self.all_cacheable:
+                self.cacheable.add(route)
+        self.query = tuple(sorted(query))
+
+    def __call__(self, request):
+        method = request.method
+        key = [method, request.environ['PATH_INFO']]
+        if self.subdomain:
+            key.append(request.url.subdomain)
+        if self.format:
+            key.append(request.environ.get('HTTP_ACCEPT'))
+        if self.query and method == 'GET':
+            get = request.get
+            key.extend(_hashable(get.get(name)) for name in self.query)
+        return tuple(key)
+
+    def storable(self, route_match):
+        if route_match is None:
+            return self.all_cacheable
+        return route_match.route in self.cacheable
+
+
+def _sort_key(route):
+    path = route.path
+    if not path:
+        # The source of lazy routes, so they are not compiled when added
+        path = getattr(route, '_source', None) or route.regex
+        path = getattr(path, 'pattern', path)
+    return route.priority, path
+
+
+def _encode_query_string(query, separator):
+    # Encoded as urllib.parse.urlencode(query, doseq=True) would, but joined
+    # with the separator.
+    pairs = []
+    for key, value in query.items():
+        key = quote_plus(str(key))
+        if isinstance(value, (list, tuple)):
+            pairs.extend('{0}={1}'.format(key, quote_plus(str(v))) for v in value)
+        else:
+            pairs.append('{0}={1}'.format(key, quote_plus(str(value))))
+    return '?' + separator.join(pairs) if pairs else ''
+
+
+def _request_from(request):
+    # Routers accept ASGI scopes, and (method, path, host, accept) tuples
+    if isinstance(request, dict):
+        return ScopeRequest(request)
+    if isinstance(request, tuple):
+        return PathRequest(*request)
+    return request
+
+
+def _overlapping_matches(route_matches, overlapping):
+    # Stops once none of the remaining routes could also match the request
+    remaining = None
+    for route_match in route_matches:
+        yield route_match
+        others = overlapping[route_match.route]
+        remaining = others if remaining is None else remaining & others
+        if not remaining:
+            return
+
+
+def _first_match(router, request):
+    match = router._snapshot().frozen
+    if match is not None:
+        return match(request)
+    for route_match in router.matches(request):
+        return route_match
+    return None
+
+
+def _cached_match(router, request, first_match=_first_match):
+    cache = router.cache
+    # Read prior to the routes, so a result from routes that have since
+    # changed is never stored.
+    generation = cache.generation
+    cache_key = router._get_cache_key()
+    if generation != cache.generation:
+        # The snapshot of the routes was replaced (clearing the cache)
+        generation = cache.generation
+        cache_key = router._get_cache_key()
+    key = cache_key(request)
+    found, route_match = cache.get(key)
+    if not found:
+        route_match = first_match(router, request)
+        if cache_key.storable(route_match):
+            cache.set(key, route_match, generation)
+    if route_match:
+        route_match = RouteMatch(route_match.route, dict(route_match.params))
+    return route_match
+
+
+def _instrumented_match(router, request):
+    # Candidates are matched one at a time so that they can be counted, which
+    # gives the same result as the matcher (but not always the same timing).
+    instrument = router.instrument
+    tried = 0
+
+    def first_match(router, request):
+        nonlocal tried
+        for route in router.matcher.candidates(request):
+            tried += 1
+            route_match = route.match(request)
+            if route_match:
+                return route_match
+            instrument.rejected(route, route.rejected_by(request))
+        return None
+
+    start = time.perf_counter()
+    if router.cache is not None:
+        route_match = _cached_match(router, request, first_match)
+    else:
+        route_match = first_match(router, request)
+    instrument.matched(request, route_match, tried, time.perf_counter() - start)
+    return route_match
+
+
+class _Table(object):
+
+    """An immutable snapshot of the routes of a router.
+
+    Everything derived from the routes (the dict of routes, the matcher and
+    the cache key) is built on first use and kept with the snapshot, so a
+    reader always sees a consistent set of routes.
+
+    Attributes:
+        frozen (callable): The function generated by router.freeze(), if the
+            router has been frozen since the snapshot was taken.
+        overlapping (dict): The overlapping routes found by router.analyse(),
+            if the router was pruned since the snapshot was taken.
+    """
+    __slots__ = ('version', 'ordered', 'named', 'frozen', 'overlapping',
+                 '_matcher_class', '_routes', '_matcher', '_cache_key')
+
+    def __init__(self, version, ordered, matcher_class):
+        self.version = version
+        self.ordered = tuple(ordered)
+        self.named = {}
+        for route in self.ordered:
+            self.named.setdefault(route.name, route)
+        self._matcher_class = matcher_class
+        self._routes = self._matcher = self._cache_key = self.frozen = None
+        self.overlapping = None
+
+    @property
+    def routes(self):
+        if self._routes is None:
+            self._routes = collections.OrderedDict(
+                (name, route) for name, route in self.named.items())
+        return self._routes
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            self._matcher = self._matcher_class(self.ordered)
+        return self._matcher
+
+    @property
+    def cache_key(self):
+        if self._cache_key is None:
+            self._cache_key = _CacheKey(self.matcher.routes)
+        return self._cache_key
+
+    def matches(self, request):
+        route_matches = self.matcher.matches(request)
+        if self.overlapping is not None:
+            route_matches = _overlapping_matches(route_matches, self.overlapping)
+        return route_matches
+
+    def prune(self, analysis):
+        """Replaces the matcher with one for only the reachable routes.
+        """
+        routes = analysis.reachable
+        self._matcher = self._matcher_class(routes)
+        self._cache_key = None
+        self.overlapping = analysis.overlapping
+        if self.frozen is not None:
+            self.frozen = compile_match(routes, self._matcher.candidates)
+
+
 class Base(metaclass=abc.ABCMeta):
 
     """Responsible for maintaining a list of routes.
 
+    Routes are kept in order of priority as they are added, with routes of
+    the same priority ordered by their path (both descending). Routes with the
+    same priority and path are ordered with the most recently added first.
+
+    Routes can be added while other threads are matching requests. Changes
+    are made under a lock, and readers match against an immutable snapshot
+    of the routes which is replaced (rather than modified) on the first read
+    after a change.
+
     Attributes:
         routes (OrderedDict): A dict of routes
+        matcher (watson.routing.matchers.Base): The matcher used to find the
+            candidate routes for a request.
+        cache (MatchCache): The cache of match results, if a cache_size was
+            specified when the router was created.
+        instrument (watson.routing.instruments.Base): Receives the details of
+            each call to match, if one was specified when the router was created.
     """
-    _requires_sort = False
     _build_strategies = None
-    _routes = None
+    _named = None
+    _keys = None
+    _ordered = None
+    _sequence = 0
+    _matcher_class = None
+    _table = None
+    _lock = None
+    _version = 0
+    _lazy = False
+    cache = None
+    instrument = None
 
     @property
     def routes(self):
-        return self._routes
+        return self._snapshot().routes
+
+    @property
+    def matcher(self):
+        return self._snapshot().matcher
 
-    def __init__(self, routes=None, build_strategies=None):
+    def __init__(self, routes=None, build_strategies=None, matcher=None,
+                 cache_size=None, lazy=False, instrument=None):
         default_build_strategies = (SegmentRoute.builder, LiteralRoute.builder)
         if not build_strategies:
             build_strategies = []
         build_strategies.extend(default_build_strategies)
         self._build_strategies = build_strategies
-        self._routes = collections.OrderedDict()
+        self._matcher_class = matcher or matchers.Linear
+        self._lazy = lazy
+        self.instrument = instrument
+        if cache_size:
+            self.cache = MatchCache(cache_size)
+        self._lock = threading.RLock()
+        self._named = {}
+        self._keys = []
+        self._ordered = []
 
     def build_route(self, **definition):
         """Converts a route definition into a specific route.
@@ -43,29 +370,79 @@ class Base(metaclass=abc.ABCMeta):
         """Match a request against all the routes.
 
         Args:
-            request (watson.http.messages.Request): The request to match.
+            request (watson.http.messages.Request|dict): The request (or ASGI
+                scope) to match.
 
         Returns:
             A list of RouteMatch namedtuples.
         """
-        self.sort()
-        for name, route in self:
-            route_match = route.match(request)
-            if route_match:
-                yield route_match
+        request = _request_from(request)
+        for route_match in self._snapshot().matches(request):
+            yield route_match
 
     def match(self, request):
         """Match a request against all the routes and return the first match.
 
         Args:
-            request (watson.http.messages.Request): The request to match.
+            request (watson.http.messages.Request|dict): The request (or ASGI
+                scope) to match.
 
         Returns:
             The RouteMatch of the route.
         """
-        for route_match in self.matches(request):
-            return route_match
-        return None
+        request = _request_from(request)
+        if self.instrument is not None:
+            return _instrumented_match(self, request)
+        if self.cache is not None:
+            return _cached_match(self, request)
+        return _first_match(self, request)
+
+    async def match_async(self, request):
+        """Match a request against all the routes and return the first match.
+
+        A coroutine for use within asyncio servers (for example an ASGI
+        application). Matching never blocks on I/O, so the request is matched
+        immediately.
+
+        Args:
+            request (dict|watson.http.messages.Request): The ASGI scope (or
+                request) to match.
+
+        Returns:
+            The RouteMatch of the route.
+        """
+        return self.match(request)
+
+    def match_many(self, requests):
+        """Match many requests against the routes.
+
+        Each distinct request (as far as the routes are concerned) is only
+        matched once, which makes this suitable for resolving large numbers
+        of paths, for example when analysing logs or warming caches.
+
+        Args:
+            requests (iterable): The requests to match, either as
+                watson.http.messages.Request objects, ASGI scopes or as
+                (method, path, host, accept) tuples.
+
+        Returns:
+            A generator of the RouteMatch (or None) of each request, in the
+            same order as the requests.
+        """
+        cache_key = self._get_cache_key()
+        results = {}
+        for request in requests:
+            request = _request_from(request)
+            key = cache_key(request)
+            try:
+                route_match = results[key]
+            except KeyError:
+                route_match = _first_match(self, request)
+                if cache_key.storable(route_match):
+                    results[key] = route_match
+            if route_match:
+                route_match = RouteMatch(route_match.route, dict(route_match.params))
+            yield route_match
 
     def assemble(self, route_name, **kwargs):
         """Converts the route into a path.
@@ -80,20 +457,56 @@ class Base(metaclass=abc.ABCMeta):
         Raises:
             KeyError if the route does not exist on the router.
         """
-        if route_name in self:
+        named = self._snapshot().named
+        if route_name in named:
             query_string = self._extract_query_string(
                 **kwargs.get('query_string', {}))
-            return self.routes[route_name].assemble(**kwargs) + query_string
+            return named[route_name].assemble(**kwargs) + query_string
         else:
             raise KeyError(
                 'No route named {0} can be found.'.format(route_name))
 
+    def assemble_many(self, route_name, params, separator='&'):
+        """Converts the route into many paths.
+
+        The route is only looked up once, and the query_string of each set
+        of params is encoded (with urllib.parse semantics), which makes this
+        suitable for rendering large listings of links.
+
+        Example:
+
+        .. code-block:: python
+
+            urls = router.assemble_many('search', (
+                {'keyword': keyword, 'query_string': {'page': 2}}
+                for keyword in keywords), separator='&amp;')
+
+        Args:
+            route_name (string): The name of the route
+            params (iterable): A dict of params for each path.
+            separator (string): The separator of the query string pairs, for
+                example '&amp;' when the paths are rendered into HTML.
+
+        Raises:
+            KeyError if the route does not exist on the router.
+
+        Returns:
+            A generator of the paths, in the same order as the params.
+        """
+        named = self._snapshot().named
+        if route_name not in named:
+            raise KeyError(
+                'No route named {0} can be found.'.format(route_name))
+        return self._assemble_many(named[route_name], params, separator)
+
     def add_definition(self, definition):
         """Converts a route definition into a route.
 
         Args:
             definition (dict): The definition to add.
         """
+        if self._lazy:
+            definition = dict(definition, lazy=True)
         route = self.build_route(**definition)
         self._create_child_routes(definition, route)
         self.add_route(route)
@@ -102,23 +515,165 @@ class Base(metaclass=abc.ABCMeta):
     def add_route(self, route):
         """Adds an instantiated route to the router.
 
+        The route is inserted into position based on its priority, replacing
+        any existing route of the same name.
+
         Args:
             route (watson.routing.routes.BaseRoute): The route to add.
         """
-        self._requires_sort = True
-        self.routes[route.name] = route
+        with self._lock:
+            existing = self._named.get(route.name)
+            if existing is not None:
+                index = bisect.bisect_left(self._keys, self._key_of(existing))
+                del self._keys[index]
+                del self._ordered[index]
+            self._sequence += 1
+            key = _sort_key(route) + (self._sequence,)
+            index = bisect.bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self._ordered.insert(index, route)
+            self._named[route.name] = route
+            self._version += 1
+            self._invalidate()
+
+    def warm(self):
+        """Compiles all the routes and the matcher ahead of time.
+
+        Useful for routers created with lazy=True, for example prior to forking
+        worker processes so that the compiled routes are shared between them.
+        """
+        for name, route in self:
+            compile = getattr(route, 'compile', None)
+            if compile:
+                compile()
+        self.matcher.warm()
+
+    def freeze(self):
+        """Generates a function to match requests against the routes.
+
+        Each route is compiled into only the checks it requires (see
+        watson.routing.frozen), and the routes to check are still retrieved
+        from the candidates of the matcher, so the narrowing of the matcher
+        is retained. The function is used by match() and match_many() in
+        place of the matcher until the routes change, at which point the
+        router is thawed and must be frozen again. Instrumented routers
+        continue to match each route in turn.
+
+        Raises:
+            TypeError if the matcher matches requests itself rather than
+                through its candidates (for example matchers.Regex and
+                matchers.Adaptive), as freezing would bypass it.
+
+        Returns:
+            callable: The generated function, its source is available as the
+                'source' attribute.
+        """
+        snapshot = self._snapshot()
+        matcher = snapshot.matcher
+        if type(matcher).matches is not matchers.Base.matches:
+            raise TypeError(
+                '{0} matches requests itself and cannot be frozen.'.format(
+                    get_qualified_name(matcher)))
+        snapshot.frozen = compile_match(matcher.routes, matcher.candidates)
+        return snapshot.frozen
+
+    def analyse(self, prune=False):
+        """Finds the routes that are shadowed by, or overlap with, other routes.
+
+        See watson.routing.analysis.Analysis.
+
+        Args:
+            prune (boolean): Whether or not to remove the shadowed routes from
+                the matcher (they can still be assembled). Once pruned,
+                matches() also stops as soon as none of the remaining routes
+                overlap with the routes matched so far. Applies until the
+                routes change.
+
+        Returns:
+            watson.routing.analysis.Analysis: The analysis of the routes.
+        """
+        snapshot = self._snapshot()
+        analysis = Analysis(snapshot.ordered)
+        if prune:
+            snapshot.prune(analysis)
+            if self.cache is not None:
+                self.cache.clear()
+        return analysis
+
+    def thaw(self):
+        """Matches requests with the routes and the matcher again.
+
+        Useful when debugging a frozen router, as each route is matched by
+        calling its match method.
+        """
+        self._snapshot().frozen = None
+
+    @property
+    def frozen(self):
+        """Whether or not the router is frozen, see freeze().
+        """
+        return self._snapshot().frozen is not None
 
     def sort(self):
-        if self._requires_sort:
-            self._routes = collections.OrderedDict(
-                reversed(sorted(self.routes.items(),
-                         key=lambda r: (r[1].priority, r[1].path_or_regex))))
-            self._requires_sort = False
+        """Routes are sorted as they are added.
+
+        Retained for backwards compatibility.
+        """
+        pass
 
     # Internals
 
+    def _snapshot(self):
+        table = self._table
+        if table is None:
+            with self._lock:
+                table = self._table
+                if table is None:
+                    table = self._table = _Table(
+                        self._version, self._prioritised_routes(), self._matcher_class)
+        return table
+
+    def _invalidate(self):
+        self._table = None
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _key_of(self, route):
+        # Routes are unique by name, so the existing key can be found by
+        # searching only the keys with the same priority and path.
+        start = bisect.bisect_left(self._keys, _sort_key(route))
+        for index in range(start, len(self._keys)):
+            if self._ordered[index] is route:
+                return self._keys[index]
+
+    def _prioritised_routes(self):
+        return list(reversed(self._ordered))
+
+    def _restore(self, routes):
+        # Replaces the routes with routes that are already in sorted order
+        named, keys, ordered = {}, [], []
+        with self._lock:
+            for route in reversed(list(routes)):
+                self._sequence += 1
+                keys.append(_sort_key(route) + (self._sequence,))
+                ordered.append(route)
+                named[route.name] = route
+            self._named, self._keys, self._ordered = named, keys, ordered
+            self._version += 1
+            self._invalidate()
+
+    def _assemble_many(self, route, params, separator):
+        assemble = route.assemble
+        for kwargs in params:
+            path = assemble(**kwargs)
+            query = kwargs.get('query_string')
+            yield path + _encode_query_string(query, separator) if query else path
+
+    def _get_cache_key(self):
+        return self._snapshot().cache_key
+
     def __contains__(self, route_name):
-        return route_name in self.routes
+        return route_name in self._snapshot().named
 
     def _extract_query_string(self, **kwargs):
         parts = ['{}={}'.format(key, value) for key, value in kwargs.items()]
@@ -143,7 +698,7 @@ class Base(metaclass=abc.ABCMeta):
             self.add_definition(child)
 
     def __len__(self):
-        return len(self.routes)
+        return len(self._snapshot().ordered)
 
     def __bool__(self):
         return True
@@ -162,12 +717,33 @@ class Base(metaclass=abc.ABCMeta):
 
 class Choice(Base):
     """Search for a match to a route from multiple routers.
+
+    The routes of all the routers are merged into a single snapshot (ordered
+    by router, and then by the priority of the routes within each router)
+    which is rebuilt whenever a router is added or one of the routers
+    changes. The snapshot indexes the routes by name, so assemble() and 'in'
+    are a single lookup. Where routers contain routes of the same name, the
+    route from the first router is used.
+
+    Attributes:
+        matcher (watson.routing.matchers.Base): The matcher for the routes of
+            all the routers.
     """
 
     routers = None
 
-    def __init__(self, *routers):
+    @property
+    def _version(self):
+        # Changes whenever a router is added, or one of the routers changes
+        return sum(router._version for router in self.routers) + len(self.routers)
+
+    def __init__(self, *routers, matcher=None, cache_size=None, instrument=None):
         self.routers = []
+        self._matcher_class = matcher or matchers.Linear
+        self.instrument = instrument
+        self._lock = threading.RLock()
+        if cache_size:
+            self.cache = MatchCache(cache_size)
         for router in routers:
             if isinstance(router, Base):
                 self.add_router(router)
@@ -187,40 +763,60 @@ class Choice(Base):
         """Match a request against all the routes.
 
         Args:
-            request (watson.http.messages.Request): The request to match.
+            request (watson.http.messages.Request|dict): The request (or ASGI
+                scope) to match.
 
         Returns:
             A list of RouteMatch namedtuples.
         """
-        for router in self.routers:
-            for route_match in router.matches(request):
-                yield route_match
+        request = _request_from(request)
+        for route_match in self._snapshot().matches(request):
+            yield route_match
 
     def match(self, request):
         """Match a request against all the routes and return the first match.
 
         Args:
-            request (watson.http.messages.Request): The request to match.
+            request (watson.http.messages.Request|dict): The request (or ASGI
+                scope) to match.
 
         Returns:
             The RouteMatch of the route.
         """
-        for route_match in self.matches(request):
-            return route_match
-        return None
-
-    def assemble(self, route_name, **kwargs):
-        """See: Base.assemble
+        request = _request_from(request)
+        if self.instrument is not None:
+            return _instrumented_match(self, request)
+        if self.cache is not None:
+            return _cached_match(self, request)
+        return _first_match(self, request)
+
+    def warm(self):
+        """See: Base.warm
         """
         for router in self.routers:
-            if route_name in router:
-                query_string = self._extract_query_string(
-                    **kwargs.get('query_string', {}))
-                return router.routes[route_name].assemble(**kwargs) + query_string
-        raise KeyError('No route named {0} can be found.'.format(route_name))
+            router.warm()
+        self.matcher.warm()
 
     # Internals
 
+    def _snapshot(self):
+        # Routes added to any of the routers will invalidate the snapshot
+        versions = tuple(router._version for router in self.routers)
+        table = self._table
+        if table is None or table.version != versions:
+            with self._lock:
+                table = self._table
+                if table is None or table.version != versions:
+                    table = self._table = _Table(
+                        versions, self._prioritised_routes(), self._matcher_class)
+                    if self.cache is not None:
+                        self.cache.clear()
+        return table
+
+    def _prioritised_routes(self):
+        return [route for router in self.routers
+                for route in router._snapshot().ordered]
+
     def __getitem__(self, class_):
         """Retrieve a specific router instance from associated routers.
 
@@ -239,9 +835,6 @@ class Choice(Base):
     def __bool__(self):
         return True
 
-    def __len__(self):
-        return len([(name, route) for name, route in self])
-
     def __iter__(self):
         for router in self.routers:
             if router:
@@ -263,8 +856,8 @@ class List(Base):
     Priority will automatically be assigned based upon the order of the route
     definitions in the list.
     """
-    def __init__(self, routes=None, build_strategies=None):
-        super(List, self).__init__(routes, build_strategies)
+    def __init__(self, routes=None, build_strategies=None, **kwargs):
+        super(List, self).__init__(routes, build_strategies, **kwargs)
         if not routes:
             routes = []
         for priority, route_definition in enumerate(routes):
@@ -279,8 +872,8 @@ class List(Base):
 class Dict(Base):
     """Create routes from a dictionary of route definitions.
     """
-    def __init__(self, routes=None, build_strategies=None):
-        super(Dict, self).__init__(routes, build_strategies)
+    def __init__(self, routes=None, build_strategies=None, **kwargs):
+        super(Dict, self).__init__(routes, build_strategies, **kwargs)
         if not routes:
             routes = {}
         for name, route_definition in routes.items():
@@ -1,16 +1,109 @@
 # -*- coding: utf-8 -*-
 import abc
 import collections
+import functools
 import re
+import uuid
 from watson.http import REQUEST_METHODS, MIME_TYPES
 from watson.common.imports import get_qualified_name
 
-__all__ = ('Base', 'Literal', 'Segment', 'RouteMatch')
+__all__ = ('Base', 'Literal', 'Segment', 'RouteMatch', 'Converter')
 
 # route: The matched route
 # params: The parameters that have been matched
 RouteMatch = collections.namedtuple('RouteMatch', 'route params')
 
+# regex: The pattern a segment must match
+# to_python: Converts the matched string into a value
+# to_url: Converts a value back into a string when assembling the route
+Converter = collections.namedtuple('Converter', 'regex to_python to_url')
+
+# The converters available to segments, /user/:id<int>
+converters = {
+    'int': Converter(r'\d+', int, str),
+    'uuid': Converter(
+        r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}',
+        uuid.UUID, str),
+    'slug': Converter(r'[-a-zA-Z0-9_]+', str, str),
+    'path': Converter(r'.+', str, str),
+}
+
+# A reverse index of MIME_TYPES, mime type -> format
+formats_by_mime_type = {
+    mime_type: format
+    for format, mime_types in MIME_TYPES.items() for mime_type in mime_types}
+
+
+@functools.lru_cache(maxsize=256)
+def formats_from_accept(accept):
+    """Converts an Accept header into the formats it accepts.
+
+    Mime types are ordered by their quality value (types with q=0 are not
+    acceptable), and only those that appear in watson.http.MIME_TYPES are
+    converted into formats. Wildcards are ignored.
+
+    Args:
+        accept (string): The value of the Accept header.
+
+    Returns:
+        tuple: The accepted formats in order of preference.
+    """
+    if not accept:
+        return ()
+    accepted = []
+    for index, media_range in enumerate(accept.split(',')):
+        mime_type, _, params = media_range.partition(';')
+        format = formats_by_mime_type.get(mime_type.strip().lower())
+        if not format:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if quality > 0:
+            accepted.append((-quality, index, format))
+    formats = []
+    for quality, index, format in sorted(accepted):
+        if format not in formats:
+            formats.append(format)
+    return tuple(formats)
+
+
+# The requirements checked after the method and path of a route, each accepts
+# the route and the request and allocates nothing when the request is rejected.
+
+def _subdomain_met(route, request):
+    return request.url.subdomain in route._subdomains
+
+
+def _format_met(route, request):
+    return _preferred_format(route, request) is not None
+
+
+def _query_met(route, request):
+    if request.method != 'GET':
+        return True
+    get = request.get
+    if get:
+        regexes = route._query_regexes
+        for key, value in get.items():
+            regex = regexes.get(key, None)
+            if regex and not regex.match(value):
+                return False
+    return True
+
+
+def _preferred_format(route, request):
+    formats = route._formats
+    for format in formats_from_accept(request.environ.get('HTTP_ACCEPT')):
+        if format in formats:
+            return format
+    return None
+
 
 class Base(metaclass=abc.ABCMeta):
     """Matches a request to a specific pattern.
@@ -21,7 +114,8 @@ class Base(metaclass=abc.ABCMeta):
     Additional options can be added to 'requires' to force additional matching.
 
     - subdomain: The subdomain to match
-    - format: The accept format (/path.xml or Accept: text/xml in headers)
+    - format: The accept format (Accept: text/xml in headers), the most
+      preferred format that matches is added to the params
 
     Child routes can also be added, to less the amount of typing required to
     define further routes.
@@ -32,6 +126,10 @@ class Base(metaclass=abc.ABCMeta):
         accepts (tuple): The REQUEST_METHODS that are accepted.
         requires (dict): A dict of values that must be matched, can be a regular expression.
         priority (int): If multiple matching routes are found, determine relevance.
+        cacheable (bool): Whether or not the result of matching the route can
+            be cached by a router, see watson.routing.routers.MatchCache.
+        subdomains (frozenset): The subdomains the route is restricted to, or
+            None if it has no subdomain requirement.
 
     Example:
 
@@ -58,7 +156,8 @@ class Base(metaclass=abc.ABCMeta):
         matches = [match for match in router.matches(Request(environ))]
     """
     __slots__ = ('_name', '_path', '_accepts', '_requires', '_defaults',
-                 '_options', '_priority', '_regex_requires')
+                 '_options', '_priority', '_regex_requires', '_cacheable',
+                 '_formats', '_subdomains', '_query_regexes', '_predicates')
 
     @property
     def name(self):
@@ -88,13 +187,21 @@ class Base(metaclass=abc.ABCMeta):
     def priority(self):
         return int(self._priority) or 1
 
+    @property
+    def cacheable(self):
+        return self._cacheable
+
+    @property
+    def subdomains(self):
+        return self._subdomains
+
     @property
     def path_or_regex(self):
         return self.path if self.path else self.regex
 
     def __init__(self, name, path,
                  accepts=None, requires=None, defaults=None, options=None,
-                 priority=1, **kwargs):
+                 priority=1, cacheable=True, **kwargs):
         self._name = name
         self._path = path
         self._accepts = accepts or REQUEST_METHODS
@@ -102,6 +209,7 @@ class Base(metaclass=abc.ABCMeta):
         self._defaults = defaults or {}
         self._options = options or {}
         self._priority = priority
+        self._cacheable = cacheable
         self._process_requires()
 
     def builder(cls, **definition):
@@ -109,6 +217,30 @@ class Base(metaclass=abc.ABCMeta):
 
     def _process_requires(self):
         self._regex_requires = {k: re.compile(v) for k, v in self.requires.items() if isinstance(v, str)}
+        self._formats = None
+        if 'format' in self._regex_requires:
+            regex = self._regex_requires['format']
+            self._formats = frozenset(format for format in MIME_TYPES if regex.match(format))
+        self._subdomains = None
+        if 'subdomain' in self.requires:
+            subdomain = self.requires['subdomain']
+            if isinstance(subdomain, (list, tuple)):
+                self._subdomains = frozenset(subdomain)
+            else:
+                self._subdomains = frozenset((subdomain,))
+        # Query string values are only checked when there are requirements
+        # other than the subdomain and format (but are checked against all)
+        self._query_regexes = None
+        if set(self.requires) - {'subdomain', 'format'}:
+            self._query_regexes = self._regex_requires
+        predicates = []
+        if self._subdomains is not None:
+            predicates.append(_subdomain_met)
+        if self._formats is not None:
+            predicates.append(_format_met)
+        if self._query_regexes is not None:
+            predicates.append(_query_met)
+        self._predicates = tuple(predicates)
 
     def assemble(self, prefix=None, **kwargs):
         raise NotImplementedError()
@@ -132,39 +264,68 @@ class Base(metaclass=abc.ABCMeta):
         Args:
             request (watson.http.messages.Request): The request to match.
         """
-        params = self.defaults.copy()
-        requires = self.requires.copy()
-        if request.method not in self._accepts:
-            return None
-        if 'subdomain' in self.requires:
-            del requires['subdomain']
-            subdomain = self.requires['subdomain']
-            if isinstance(subdomain, (list, tuple)):
-                if request.url.subdomain not in subdomain:
-                    return None
-            elif request.url.subdomain != subdomain:
-                return None
-        if 'format' in self.requires:
-            del requires['format']
-            accept_headers = request.environ.get('HTTP_ACCEPT')
-            formats = [format for format
-                       in MIME_TYPES if accept_headers in MIME_TYPES[format]]
-            if formats:
-                for format in formats:
-                    if self._regex_requires['format'].match(format):
-                        params['format'] = format
-            else:
-                return None
-        if request.method == 'GET' and requires and request.get:
+        if request.method in self._accepts and self._requirements_met(request):
+            return self._params(request)
+        return None
+
+    def _requirements_met(self, request):
+        # The requirements are precompiled (cheapest first) into predicates
+        for predicate in self._predicates:
+            if not predicate(self, request):
+                return False
+        return True
+
+    def _params(self, request):
+        # Only called once the route has matched the request
+        params = dict(self._defaults)
+        if self._formats is not None:
+            params['format'] = _preferred_format(self, request)
+        if self._query_regexes is not None and request.method == 'GET':
+            regexes = self._query_regexes
             for key, value in request.get.items():
-                regex = self._regex_requires.get(key, None)
-                if regex:
-                    if regex.match(value):
-                        params[key] = value
-                    else:
-                        return None
+                if key in regexes:
+                    params[key] = value
         return params
 
+    def rejected_by(self, request):
+        """Determine which requirement of the route a request does not meet.
+
+        This repeats the work of match, and is only intended for diagnostics
+        (see watson.routing.instruments).
+
+        Args:
+            request (watson.http.messages.Request): The request to check.
+
+        Returns:
+            string: One of 'method', 'subdomain', 'format', 'query' or 'path',
+                or None if the route matches the request.
+        """
+        if request.method not in self._accepts:
+            return 'method'
+        if self._subdomains is not None and request.url.subdomain not in self._subdomains:
+            return 'subdomain'
+        if self._formats is not None and not any(
+                format in self._formats
+                for format in formats_from_accept(request.environ.get('HTTP_ACCEPT'))):
+            return 'format'
+        if Base.match(self, request) is None:
+            return 'query'
+        if not self.match(request):
+            return 'path'
+        return None
+
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', {}))
+        for class_ in type(self).__mro__:
+            for slot in getattr(class_, '__slots__', ()):
+                if hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
     def __repr__(self):
         return (
             '<{0} name:{1} path:{2}>'.format(
@@ -175,7 +336,7 @@ class Base(metaclass=abc.ABCMeta):
 
 
 segments_pattern = re.compile(r'(?P<static>[^:\[\]]*)(?P<token>[:\[\]]|$)')
-token_pattern = re.compile(r'(?P<name>[^:/\[\]]+)')
+token_pattern = re.compile(r'(?P<name>[^:/\[\]<]+)(?:<(?P<converter>[^>]*)>)?')
 optional_segment_string = '(?:{value})?'
 value_pattern_string = '(?P<{value}>{end})'
 end_pattern_string = '[^/]+'
@@ -189,6 +350,7 @@ def segments_from_path(path):
     - /route/:segment, segment will be a required parameter
     - /route[/:segment], segment will be an optional parameter
     - /route[/:segment[/:nested]] - segment will be a optional parameter
+    - /route/:segment<int>, segment will be converted (see converters_from_path)
 
     Inspired by both Rails and ZF2.
 
@@ -213,7 +375,7 @@ def segments_from_path(path):
             named_segment = token_pattern.search(path)
             segment = named_segment.groupdict()['name']
             depth_segments[depth].append(('segment', segment))
-            path = path[len(segment):]
+            path = path[len(named_segment.group(0)):]
         elif token == '[':
             depth += 1
             current_depth = depth - 1
@@ -233,12 +395,38 @@ def segments_from_path(path):
     return segments
 
 
-def regex_from_segments(segments, requires=None, escape_segment=True):
+def converters_from_path(path):
+    """Retrieve the converters declared for the segments of a path.
+
+    Args:
+        path (string): The segmented path, for example /user/:id<int>
+
+    Raises:
+        ValueError if the converter does not exist in converters.
+
+    Returns:
+        dict: The segment names and their Converter.
+    """
+    declared = {}
+    for token in re.finditer(r':' + token_pattern.pattern, path):
+        name, converter = token.group('name'), token.group('converter')
+        if converter is None:
+            continue
+        if converter not in converters:
+            raise ValueError(
+                "Unknown converter '{0}' for segment '{1}'.".format(converter, name))
+        declared[name] = converters[converter]
+    return declared
+
+
+def regex_from_segments(segments, requires=None, escape_segment=True, converters=None):
     """Converts a list of segment tuple pairs into a regular expression string.
 
     Args:
         segments (list): The segment tuple pairs to convert.
         requires (dict): Key/value pairs to be used in each segment.
+        converters (dict): The Converter of each segment, used when the
+            segment has no requirement of its own.
 
     Returns:
         string: The regex for the segments
@@ -252,12 +440,18 @@ def regex_from_segments(segments, requires=None, escape_segment=True):
         elif type_ == 'optional':
             regex.append(
                 optional_segment_string.format(
-                    value=regex_from_segments(value, requires)))
+                    value=regex_from_segments(value, requires, converters=converters)))
         else:
+            if value in requires:
+                end = requires[value]
+            elif converters and value in converters:
+                end = converters[value].regex
+            else:
+                end = end_pattern_string
             regex.append(
                 value_pattern_string.format(
                     value=value,
-                    end=requires.get(value, end_pattern_string)))
+                    end=end))
     regex.append('$')
     return ''.join(regex)
 
@@ -289,44 +483,159 @@ def path_from_segments(segments, params, optional=False):
     return ''.join(path)
 
 
+_static, _segment, _optional = range(3)
+
+
+def _assembly_plan(segments, optional=False):
+    plan = []
+    for type_, name in segments:
+        optional = optional if optional else type_ == 'optional'
+        if isinstance(name, list):
+            plan.append((_optional, _assembly_plan(name, optional), optional, 0))
+        elif type_ == 'segment':
+            plan.append((_segment, name, optional, len(segments) - 1))
+        else:
+            plan.append((_static, name, optional, 0))
+    return tuple(plan)
+
+
+def _path_from_plan(plan, kwargs, defaults, to_url):
+    path = []
+    for type_, name, optional, remove_segments in plan:
+        if type_ is _static:
+            path.append(name)
+        elif type_ is _segment:
+            value = kwargs[name] if name in kwargs else defaults.get(name)
+            if value or (value is not None and name in to_url):
+                path.append(to_url[name](value) if name in to_url else str(value))
+            elif optional:
+                path = path[0:-remove_segments]
+            else:
+                raise KeyError("Missing '{0}' in params.".format(name))
+        else:
+            path.append(_path_from_plan(name, kwargs, defaults, to_url))
+    return ''.join(path)
+
+
+def assembler_from_segments(segments, converters=None):
+    """Compiles a list of segment tuple pairs into a function that creates a url path.
+
+    The function produces the same path as path_from_segments, but without
+    having to walk the segments each time. Paths without optional segments are
+    compiled into a single format string.
+
+    Args:
+        segments (list): The segment tuple pairs to convert.
+        converters (dict): The Converter of each segment, used to convert
+            values into strings. A segment with a converter is only missing
+            when its value is None, so that falsy values such as 0 can be
+            assembled.
+
+    Returns:
+        callable: A function accepting a dict of params and a dict of defaults.
+    """
+    to_url = {name: converter.to_url for name, converter in (converters or {}).items()}
+    if any(type_ == 'optional' for type_, name in segments):
+        plan = _assembly_plan(segments)
+
+        def assemble(kwargs, defaults):
+            return _path_from_plan(plan, kwargs, defaults, to_url)
+        return assemble
+
+    template = ''.join(
+        '{!s}' if type_ == 'segment' else name.replace('{', '{{').replace('}', '}}')
+        for type_, name in segments)
+    names = tuple(name for type_, name in segments if type_ == 'segment')
+
+    def assemble(kwargs, defaults):
+        values = []
+        for name in names:
+            value = kwargs[name] if name in kwargs else defaults.get(name)
+            if value is None or (not value and name not in to_url):
+                raise KeyError("Missing '{0}' in params.".format(name))
+            values.append(to_url[name](value) if name in to_url else value)
+        return template.format(*values)
+    return assemble
+
+
 class Segment(Base):
     """Matches a request against a regular expression.
 
+    When created with lazy=True, the path is not converted into a regular
+    expression until the route is first matched or assembled (or compile() is
+    called), which avoids the cost for routes that are rarely used.
+
+    Segments can declare a converter (int, uuid, slug or path), which limits
+    what the segment will match, converts the matched value and is applied in
+    reverse when assembling the route, for example /user/:id<int>.
+
     Attributes:
         regex (SRE_Pattern): The regex pattern used to match the path.
         segments (list): A tuple pair list of segments for the route.
+        converters (dict): The Converter of each segment that declares one.
     """
 
-    __slots__ = ('_regex', '_segments')
+    __slots__ = ('_regex', '_segments', '_assembler', '_source', '_pattern',
+                 '_converters')
 
     @property
     def regex(self):
+        if self._regex is None:
+            self.compile()
         return self._regex
 
     @regex.setter
     def regex(self, regex):
-        if isinstance(regex, str):
-            escape = regex.startswith('/')
-            self._segments = segments_from_path(regex)
-            regex_string = regex_from_segments(
-                self.segments, self.requires, escape_segment=escape)
-            regex = re.compile(regex_string)
-        self._regex = regex
+        self._set_source(regex)
+        self.compile()
 
     @property
     def segments(self):
+        if self._segments is None and self._source is not None:
+            self._segments = segments_from_path(self._source)
         return self._segments
 
+    @property
+    def converters(self):
+        return self._converters
+
     def __init__(self, name, path=None,
                  accepts=None, requires=None, defaults=None, options=None,
-                 priority=1, regex=None, **kwargs):
+                 priority=1, regex=None, lazy=False, **kwargs):
         if not path and not regex:
             raise TypeError(
                 'You must specify either path or regex for the route named {0}'.format(name))
         super(Segment, self).__init__(
             name, path,
             accepts, requires, defaults, options, priority, **kwargs)
-        self.regex = regex if regex else path
+        self._converters = converters_from_path(path) if path else {}
+        if lazy:
+            self._set_source(regex if regex else path)
+        else:
+            self.regex = regex if regex else path
+
+    def _set_source(self, regex):
+        self._segments = self._assembler = self._pattern = None
+        if isinstance(regex, str):
+            self._source, self._regex = regex, None
+        else:
+            self._source, self._regex = None, regex
+
+    def compile(self):
+        """Converts the path of the route into a regular expression.
+
+        Only required when the route was created with lazy=True, and even then
+        it will be called automatically when the route is first used.
+        """
+        if self._regex is None:
+            if self._pattern is None:
+                self._pattern = regex_from_segments(
+                    self.segments, self.requires,
+                    escape_segment=self._source.startswith('/'),
+                    converters=self._converters)
+            self._regex = re.compile(self._pattern)
+        if self._assembler is None and self.segments is not None:
+            self._assembler = assembler_from_segments(self.segments, self._converters)
 
     def assemble(self, prefix=None, **kwargs):
         """Converts the route into a path.
@@ -340,23 +649,61 @@ class Segment(Base):
             route = Route('search', path='/search/:keyword')
             route.assemble(keyword='test')  # /search/test
         """
-        params = collections.ChainMap(kwargs or {}, self.defaults)
-        path = path_from_segments(self.segments, params)
+        if self._assembler is None:
+            self._assembler = assembler_from_segments(self.segments, self._converters)
+        path = self._assembler(kwargs, self.defaults)
         return prefix + path if prefix else path
 
     def match(self, request):
-        params = super(Segment, self).match(request)
-        if params is None:
+        if request.method not in self._accepts:
             return None
         matches = self.regex.match(request.environ.get('PATH_INFO'))
-        if matches:
-            params = dict(params, **matches.groupdict())
-            for k, v in self.defaults.items():
-                if params[k] is None:
-                    params[k] = v
-            return RouteMatch(self, params)
+        if matches and self._requirements_met(request):
+            return self._route_match(self._params(request), matches.groupdict())
         return None
 
+    def rejected_by(self, request):
+        if not self.regex.match(request.environ['PATH_INFO']):
+            return 'path'
+        return super(Segment, self).rejected_by(request)
+
+    def match_groups(self, request, groups):
+        """Match the route to a request where the path has already been matched.
+
+        Used when the path of the request has been matched against the regex
+        of the route elsewhere (see watson.routing.matchers.Regex).
+
+        Args:
+            request (watson.http.messages.Request): The request to match.
+            groups (dict): The named groups matched from the path.
+        """
+        params = super(Segment, self).match(request)
+        if params is None:
+            return None
+        return self._route_match(params, groups)
+
+    def _route_match(self, params, groups):
+        params.update(groups)
+        for name, converter in self._converters.items():
+            value = params.get(name)
+            if value is not None and name in groups:
+                try:
+                    params[name] = converter.to_python(value)
+                except ValueError:
+                    return None
+        for k, v in self.defaults.items():
+            if params[k] is None:
+                params[k] = v
+        return RouteMatch(self, params)
+
+    def __getstate__(self):
+        state = super(Segment, self).__getstate__()
+        state['_assembler'] = None
+        if state.get('_pattern') is not None:
+            # Compiled again when the route is first used
+            state['_regex'] = None
+        return state
+
     @classmethod
     def builder(cls, **definition):
         if ('regex' in definition
@@ -405,11 +752,17 @@ class Literal(Base):
         return prefix + self.path if prefix else self.path
 
     def match(self, request):
-        params = super(Literal, self).match(request)
-        if params is not None and request.environ['PATH_INFO'] == self.path:
-            return RouteMatch(self, params=params)
+        if (request.method in self._accepts
+                and request.environ['PATH_INFO'] == self.path  # noqa
+                and self._requirements_met(request)):  # noqa
+            return RouteMatch(self, params=self._params(request))
         return None
 
+    def rejected_by(self, request):
+        if request.environ['PATH_INFO'] != self.path:
+            return 'path'
+        return super(Literal, self).rejected_by(request)
+
     @classmethod
     def builder(cls, **definition):
         return cls(**definition)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from watson.routing import __version__, routers
+
+__all__ = ('definitions_hash', 'dump', 'load', 'load_or_build')
+
+# Incremented whenever the structure of a snapshot changes.
+SNAPSHOT_VERSION = 3
+
+
+def definitions_hash(definitions):
+    """Generates a hash of the route definitions used to build a router.
+
+    The hash must be generated before the router is built, as building a
+    router will modify the definitions.
+
+    Args:
+        definitions (dict|list): The route definitions.
+
+    Returns:
+        string: The hex digest of the definitions.
+    """
+    encoded = json.dumps(definitions, sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def dump(router, filename, digest):
+    """Writes the sorted routes of a router to a snapshot file.
+
+    The file is written atomically, so that processes loading the snapshot
+    will never see a partially written file.
+
+    Args:
+        router (watson.routing.routers.Base): The router to snapshot.
+        filename (string): The path to write the snapshot to.
+        digest (string): The hash of the definitions used to build the router.
+    """
+    router.sort()
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'routing': __version__,
+        'hash': digest,
+        'routes': list(router.routes.values())
+    }
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filename, filename)
+    except Exception:
+        os.unlink(temp_filename)
+        raise
+
+
+def load(filename, digest, router_class=routers.Dict, **kwargs):
+    """Creates a router from a snapshot file.
+
+    Snapshots are pickled, so only load snapshots that have been written by
+    the application itself.
+
+    Args:
+        filename (string): The path of the snapshot.
+        digest (string): The hash of the definitions the router should be built from.
+        router_class (class): The router to create.
+        kwargs: Any additional arguments for the router.
+
+    Returns:
+        The router, or None if the snapshot does not exist, is from a
+        different version or was built from different definitions.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if (not isinstance(snapshot, dict)
+            or snapshot.get('version') != SNAPSHOT_VERSION  # noqa
+            or snapshot.get('routing') != __version__  # noqa
+            or snapshot.get('hash') != digest):  # noqa
+        return None
+    router = router_class(**kwargs)
+    router._restore(snapshot['routes'])
+    return router
+
+
+def load_or_build(router_class, definitions, filename, **kwargs):
+    """Loads a router from a snapshot, or builds it and writes the snapshot.
+
+    Example:
+
+    .. code-block:: python
+
+        router = snapshots.load_or_build(
+            routers.Dict, definitions, '/var/cache/app/routes.snapshot')
+
+    Args:
+        router_class (class): The router to create.
+        definitions (dict|list): The route definitions.
+        filename (string): The path of the snapshot.
+        kwargs: Any additional arguments for the router.
+    """
+    digest = definitions_hash(definitions)
+    router = load(filename, digest, router_class, **kwargs)
+    if router is None:
+        router = router_class(definitions, **kwargs)
+        dump(router, filename, digest)
+    return router